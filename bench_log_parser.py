@@ -0,0 +1,41 @@
+# bench_log_parser.py
+# Micro-benchmark du parseur de logs : compare le chemin regex, le chemin à positions fixes et la lecture mmap.
+# Utilisation : python bench_log_parser.py [fichier.log] [répétitions]
+import sys
+import os
+import timeit
+from log_parser import parse_line, parse_line_regex, LogFileScanner
+
+
+def main():
+    file_name = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), "log_test.LOG")
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    with open(file_name, "r", encoding="utf-8") as file:
+        lines = file.readlines()
+
+    # Tous les chemins doivent produire exactement les mêmes sessions
+    regex_rows = [parse_line_regex(line) for line in lines]
+    fast_rows = [parse_line(line) for line in lines]
+    scanner_rows = list(LogFileScanner(file_name))
+    if scanner_rows != [row for row in fast_rows if row is not None]:
+        print("ERREUR : la lecture mmap ne produit pas les mêmes sessions")
+        sys.exit(1)
+    if regex_rows != fast_rows:
+        mismatches = sum(1 for a, b in zip(regex_rows, fast_rows) if a != b)
+        print(f"ERREUR : {mismatches} lignes diffèrent entre les deux parseurs")
+        sys.exit(1)
+
+    regex_time = min(timeit.repeat(lambda: [parse_line_regex(line) for line in lines], number=1, repeat=repeat))
+    fast_time = min(timeit.repeat(lambda: [parse_line(line) for line in lines], number=1, repeat=repeat))
+    mmap_time = min(timeit.repeat(lambda: list(LogFileScanner(file_name)), number=1, repeat=repeat))
+
+    print(f"{len(lines)} lignes, {sum(row is not None for row in fast_rows)} sessions")
+    print(f"regex + strptime    : {regex_time * 1000:8.2f} ms ({len(lines) / regex_time:,.0f} lignes/s)")
+    print(f"positions fixes     : {fast_time * 1000:8.2f} ms ({len(lines) / fast_time:,.0f} lignes/s)")
+    print(f"mmap + regex octets : {mmap_time * 1000:8.2f} ms ({len(lines) / mmap_time:,.0f} lignes/s)")
+    print(f"accélération        : x{regex_time / fast_time:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,33 @@
 import os
 from PyQt6.uic import loadUi
-from PyQt6.QtCore import Qt, QStringListModel, QRect, QSize, QRectF
+from PyQt6.QtCore import Qt, QStringListModel, QRect, QSize, QRectF, QThreadPool
 from PyQt6.QtGui import QPainter, QFont, QStandardItem, QStandardItemModel, QImage, QPageSize, QPageLayout
 from PyQt6.QtSvg import QSvgGenerator
 from PyQt6.QtWidgets import QMainWindow, QVBoxLayout, QScrollArea, QCompleter, QMessageBox, QFileDialog
 from PyQt6.QtCharts import QChart, QChartView, QBarSet, QHorizontalBarSeries, QBarCategoryAxis, QValueAxis, QBarSeries
 from PyQt6.QtPrintSupport import QPrinter,QPrintDialog, QPrintPreviewDialog
 from db_manager import DBManager
+from import_worker import ChartQueryTask
+from windowed_chart import WindowedBarChart
 
 
 class BarChart(QMainWindow):
-    def __init__(self):
+    def __init__(self, db_path: str = 'logs.db'):
         super().__init__()
         ui_path = os.path.join(os.path.dirname(__file__), "stat_gui.ui")
         loadUi(ui_path, self)
-        self.db_manager = DBManager(db_path='logs.db')
+        # Même base et même connexion (celle du thread de l'interface) que la fenêtre principale
+        self.db_path = db_path
+        self.db_manager = DBManager(db_path=db_path)
+        # Les données des graphiques sont lues dans un thread du pool, une seule requête à jour à la fois
+        self.thread_pool = QThreadPool(self)
+        self.chart_task = None
+        self.chart_request_id = 0
+        self._draw_chart = None
+        self._chart_failed = None  # Appelée si la requête en cours échoue (page d'un graphique virtualisé)
+        self.windowed_chart = None  # Graphique virtualisé affiché, qui reçoit les pages lues dans le pool
+        self.refresh_windowed_chart = None  # Relit le classement du graphique virtualisé affiché (mode surveillance)
+        self.windowed_chart_key = None  # (fonction du graphique, ordre décroissant) du graphique virtualisé affiché
         self._setup_signals()
 
         # Initialize the completer
@@ -30,6 +43,12 @@ class BarChart(QMainWindow):
 
         self.sort_descending = True  # Start with descending order by default
         self.last_value_sorted_chart_function = None  # Store the last sortable chart function
+        self.current_period = None  # Période du graphique d'utilisation par poste affiché
+
+        # Données des graphiques par poste (déjà triées et limitées par la requête)
+        self.usage_seconds = {}
+        self.total_usage_seconds = 0
+        self.users_per_computer_data = {}
 
     def _setup_signals(self):
         # Connecte les signaux aux slots appropriés.
@@ -70,25 +89,132 @@ class BarChart(QMainWindow):
 
     def closeEvent(self, event):
         # Fermer la connexion à la base de données lorsque la fenêtre est fermée
+        self._cancel_chart_query()
+        self.thread_pool.waitForDone()  # Les connexions des threads du pool sont fermées avec leur requête
         self.db_manager.close()
         event.accept()
 
+    def _request_chart(self, fetch, draw, failed=None):
+        # Lit les données d'un graphique dans un thread du pool (fetch(db_manager)) puis le dessine avec draw(données)
+        # dans le thread de l'interface ; failed() est appelée si la lecture échoue.
+        # La requête d'un graphique demandé juste avant est interrompue.
+        self._cancel_chart_query()
+        self.chart_request_id += 1
+        self.chart_task = ChartQueryTask(self.db_path, self.chart_request_id, fetch)
+        self.chart_task.signals.result_ready.connect(self.on_chart_data_ready)
+        self.chart_task.signals.query_failed.connect(self.on_chart_query_failed)
+        self._draw_chart = draw
+        self._chart_failed = failed
+        self.setCursor(Qt.CursorShape.BusyCursor)
+        self.statusBar.showMessage("Calcul du graphique...")
+        self.thread_pool.start(self.chart_task)
+
+    def _request_chart_page(self, fetch):
+        # Fonction fetch_page d'un WindowedBarChart : chaque page (fetch(db_manager, offset, limit)) est lue dans le
+        # pool comme un graphique, puis livrée au graphique virtualisé affiché ; une page plus récente l'annule.
+        def fetch_page(offset, limit):
+            self._request_chart(lambda db_manager: fetch(db_manager, offset, limit),
+                                lambda rows: self.windowed_chart.show_page(offset, rows),
+                                lambda: self.windowed_chart.page_failed(offset))
+        return fetch_page
+
+    def _cancel_chart_query(self):
+        if self.chart_task is not None:
+            self.chart_task.cancel()
+            self.chart_task = None
+
+    def _end_chart_query(self, request_id) -> bool:
+        # Termine l'attente si request_id est la dernière requête lancée (le résultat d'une requête remplacée est ignoré).
+        if request_id != self.chart_request_id or self.chart_task is None:
+            return False
+        self.chart_task = None
+        self.unsetCursor()
+        self.statusBar.clearMessage()
+        return True
+
+    def on_chart_data_ready(self, request_id, data):
+        if self._end_chart_query(request_id):
+            self._draw_chart(data)
+
+    def on_chart_query_failed(self, request_id, message):
+        if self._end_chart_query(request_id):
+            if self._chart_failed is not None:
+                self._chart_failed()
+            QMessageBox.critical(self, "Erreur", f"Impossible de calculer le graphique : {message}")
+
+    def on_sessions_added(self, computers):
+        # Met à jour le graphique affiché avec de nouvelles sessions sur les postes computers (mode surveillance).
+        # Un nouveau poste peut entrer dans les N premiers : les graphiques triés relancent leur requête
+        # top-N, qui lit les agrégats déjà mis à jour par l'import. Un graphique virtualisé relit seulement
+        # sa vue d'ensemble et la page affichée, sans revenir au premier rang.
+        chart_function = self.last_value_sorted_chart_function
+        if chart_function is not None and self._windowed_chart_is_current():
+            self.refresh_windowed_chart()
+        elif chart_function is not None:
+            chart_function()
+        elif (self.stackedWidget.currentWidget() == self.page_2 and self.current_period
+              and self.lineComputer.text().strip().lower() in {computer.lower() for computer in computers}):
+            self.use_by_day_week_month_line(self.current_period)
+
+    def _windowed_chart_is_current(self) -> bool:
+        # Vrai si le graphique virtualisé est affiché (les autres graphiques remplacent le contenu de ShowGraph)
+        # et correspond toujours au graphique demandé : sans limite, même graphique et même ordre. Sinon, un autre
+        # graphique a été demandé entre-temps et c'est lui qui doit être relancé.
+        layout = self.ShowGraph.layout()
+        return (self.windowed_chart is not None and self.stackedWidget.currentWidget() == self.page
+                and layout is not None and layout.count() > 0 and layout.itemAt(0).widget() is self.windowed_chart
+                and self.db_manager.limit is None
+                and self.windowed_chart_key == (self.last_value_sorted_chart_function, self.sort_descending))
+
     def computer_percent_usage_pie(self):
         self.last_value_sorted_chart_function = self.computer_percent_usage_pie  # Store function reference
         if self.stackedWidget.currentWidget() == self.page_2:
             self.stackedWidget.setCurrentWidget(self.page)
-        # Fetch all data
-        usage_data = self.db_manager.fetch_computer_usage()
-
-        # Sort all data by percentage in descending order
-        sorted_percentage_usage_data = dict(sorted(
-            usage_data.items(),
-            key=lambda item: item[1],
-            reverse=self.sort_descending  # Use the state variable
-        ))
-
-        # Apply limit to sorted data
-        limited_sorted_data = self.db_manager.fetch_limited_data(sorted_percentage_usage_data)
+        # Seuls les postes affichés sont récupérés, déjà triés et limités par la requête
+        limit, descending = self.db_manager.limit, self.sort_descending
+        if limit is None:
+            # Sans limite : graphique virtualisé, lu page par page (vue d'ensemble et première page ici)
+            self._request_chart(
+                lambda db_manager: (
+                    db_manager.fetch_computer_usage_overview(WindowedBarChart.OVERVIEW_BUCKETS, descending),
+                    db_manager.fetch_total_usage_seconds(),
+                    db_manager.fetch_computer_usage_seconds(limit=WindowedBarChart.PAGE_SIZE, descending=descending)),
+                lambda data: self._show_windowed_computer_percent_usage(descending, *data))
+            return
+        self._request_chart(
+            lambda db_manager: (db_manager.fetch_computer_usage_seconds(limit=limit, descending=descending),
+                                db_manager.fetch_total_usage_seconds()),
+            self._show_computer_percent_usage)
+
+    def _show_windowed_computer_percent_usage(self, descending, overview, total_usage_seconds, first_page):
+        sort_order_text = "décroissant" if descending else "croissant"
+        self.windowed_chart = WindowedBarChart(
+            f"Pourcentage d'utilisation par poste (Ordre {sort_order_text})", "Pourcentage d'utilisation",
+            "Pourcentage d'utilisation", "Postes", overview,
+            self._request_chart_page(lambda db_manager, offset, limit: db_manager.fetch_computer_usage_seconds(
+                limit=limit, descending=descending, offset=offset)),
+            convert=self._percent_of(total_usage_seconds), value_format="@value%", first_page=first_page)
+        self._show_graph_widget(self.windowed_chart)
+        self.windowed_chart_key = (self.computer_percent_usage_pie, descending)
+        self.refresh_windowed_chart = lambda: self._request_chart(
+            lambda db_manager: (
+                db_manager.fetch_computer_usage_overview(WindowedBarChart.OVERVIEW_BUCKETS, descending),
+                db_manager.fetch_total_usage_seconds()),
+            lambda data: self.windowed_chart.refresh(data[0], convert=self._percent_of(data[1])))
+
+    @staticmethod
+    def _percent_of(total_usage_seconds):
+        # Pourcentage du total de tous les postes, arrondi comme usage_percentages
+        return lambda seconds: round((seconds / total_usage_seconds) * 100, 2)
+
+    def _show_computer_percent_usage(self, data):
+        self.usage_seconds, self.total_usage_seconds = data
+        self._draw_computer_percent_usage()
+
+    def _draw_computer_percent_usage(self):
+        # Dessine le graphique des pourcentages d'utilisation à partir de self.usage_seconds
+        # Les pourcentages sont calculés par rapport au total de tous les postes, pas seulement des postes affichés
+        limited_sorted_data = self.db_manager.usage_percentages(self.usage_seconds, self.total_usage_seconds)
 
         # Create QBarSet and categories using limited and sorted data
         bar_set = QBarSet("Pourcentage d'utilisation")
@@ -165,18 +291,55 @@ class BarChart(QMainWindow):
         self.last_value_sorted_chart_function = self.user_by_computers_bar  # Store function reference
         if self.stackedWidget.currentWidget() == self.page_2:
             self.stackedWidget.setCurrentWidget(self.page)
-        # Fetch all data
-        usage_data = self.db_manager.fetch_users_per_computer()
+        # Seuls les postes affichés sont récupérés, déjà triés et limités par la requête
+        limit, descending = self.db_manager.limit, self.sort_descending
+        if limit is None:
+            # Sans limite : graphique virtualisé, lu page par page (vue d'ensemble et première page ici)
+            self._request_chart(
+                lambda db_manager: (
+                    db_manager.fetch_users_per_computer_overview(WindowedBarChart.OVERVIEW_BUCKETS, descending),
+                    db_manager.fetch_users_per_computer(limit=WindowedBarChart.PAGE_SIZE, descending=descending)),
+                lambda data: self._show_windowed_users_per_computer(descending, *data))
+            return
+        self._request_chart(
+            lambda db_manager: db_manager.fetch_users_per_computer(limit=limit, descending=descending),
+            self._show_users_per_computer)
+
+    def _show_windowed_users_per_computer(self, descending, overview, first_page):
+        sort_order_text = "décroissant" if descending else "croissant"
+        self.windowed_chart = WindowedBarChart(
+            f"Utilisateurs par poste (Ordre {sort_order_text})", "Utilisateurs par poste",
+            "Nombre d'utilisateurs distinct", "Postes", overview,
+            self._request_chart_page(lambda db_manager, offset, limit: db_manager.fetch_users_per_computer(
+                limit=limit, descending=descending, offset=offset)),
+            first_page=first_page)
+        self._show_graph_widget(self.windowed_chart)
+        self.windowed_chart_key = (self.user_by_computers_bar, descending)
+        self.refresh_windowed_chart = lambda: self._request_chart(
+            lambda db_manager: db_manager.fetch_users_per_computer_overview(WindowedBarChart.OVERVIEW_BUCKETS, descending),
+            self.windowed_chart.refresh)
+
+    def _show_graph_widget(self, widget):
+        # Remplace le contenu du QFrame ShowGraph par widget
+        if self.ShowGraph.layout() is None:
+            layout = QVBoxLayout()
+            self.ShowGraph.setLayout(layout)
+        else:
+            layout = self.ShowGraph.layout()
+            while layout.count():
+                child = layout.takeAt(0)
+                if child.widget():
+                    child.widget().deleteLater()
+        layout.addWidget(widget)
+        self.ShowGraph.show()
 
-        # Sort all data by user count in descending order
-        sorted_usage_data = dict(sorted(
-            usage_data.items(),
-            key=lambda item: item[1],
-            reverse=self.sort_descending  # Use the state variable
-        ))
+    def _show_users_per_computer(self, data):
+        self.users_per_computer_data = data
+        self._draw_users_per_computer()
 
-        # Apply limit to sorted data
-        limited_sorted_data = self.db_manager.fetch_limited_data(sorted_usage_data)
+    def _draw_users_per_computer(self):
+        # Dessine le graphique des utilisateurs par poste à partir de self.users_per_computer_data
+        limited_sorted_data = self.users_per_computer_data
 
         # Create QBarSet and categories using limited and sorted data
         bar_set = QBarSet("Utilisateurs par poste")
@@ -256,9 +419,7 @@ class BarChart(QMainWindow):
     
     def use_by_day_week_month_line(self, period):
         self.last_value_sorted_chart_function = None  # Clear function reference (not value-sorted)
-        # Récupérer les données globales
-        time_data = self.db_manager.fetch_time_by_computer_day_week_month()
-
+        self.current_period = period
         # Vérifier la validité de la période
         if period not in ['Jour', 'Semaine', 'Mois']:
             raise ValueError(f"Invalid period: {period}")
@@ -267,12 +428,14 @@ class BarChart(QMainWindow):
         chosen_computer = self.lineComputer.text().strip().lower()
         # (Vous pouvez décider de gérer la casse différemment selon vos besoins)
 
-        # Filtrer pour ne garder que les données du poste choisi
-        filtered_time_data = {}
-        for computer_name, usage_dict in time_data.items():
-            # On compare en minuscules pour ignorer la casse
-            if computer_name.lower() == chosen_computer:
-                filtered_time_data[computer_name] = usage_dict
+        # Ne récupérer que l'historique du poste choisi (la casse est ignorée par la requête)
+        self._request_chart(
+            lambda db_manager: db_manager.fetch_time_by_period(chosen_computer, period),
+            lambda time_by_period: self._draw_use_by_period(period, chosen_computer, time_by_period))
+
+    def _draw_use_by_period(self, period, chosen_computer, time_by_period):
+        # Dessine l'historique d'utilisation du poste choisi pour la période donnée
+        filtered_time_data = {computer_name: {period: usage} for computer_name, usage in time_by_period.items()}
 
         # Convertir les secondes en heures pour la période demandée
         for computer in filtered_time_data:
@@ -414,19 +577,13 @@ class BarChart(QMainWindow):
         self.last_value_sorted_chart_function = self.users_per_rooms_stats  # Store function reference
         if self.stackedWidget.currentWidget() == self.page_2:
             self.stackedWidget.setCurrentWidget(self.page)
-        # Fetch all data
-        users_per_room = self.db_manager.fetch_users_per_rooms_stats()
-
-        # Sort all data by user count in descending order
-        sorted_users_per_room = dict(sorted(
-            users_per_room.items(),
-            key=lambda item: item[1],
-            reverse=self.sort_descending  # Use the state variable
-        ))
-
-        # Apply limit to sorted data
-        limited_sorted_data = self.db_manager.fetch_limited_data(sorted_users_per_room)
+        # Fetch only the displayed rooms, sorted and limited by the query
+        limit, descending = self.db_manager.limit, self.sort_descending
+        self._request_chart(
+            lambda db_manager: db_manager.fetch_users_per_rooms_stats(limit=limit, descending=descending),
+            self._draw_users_per_rooms)
 
+    def _draw_users_per_rooms(self, limited_sorted_data):
         # Create QBarSet and categories using limited and sorted data
         bar_set = QBarSet("Utilisateurs par salle")
         categories = []
@@ -502,22 +659,19 @@ class BarChart(QMainWindow):
             self.stackedWidget.setCurrentWidget(self.page)
         
         # Fetch total usage time per room
-        time_per_room = self.db_manager.fetch_time_per_rooms_stats()
+        self._request_chart(lambda db_manager: db_manager.fetch_time_per_rooms_stats(),
+                            self._draw_percentage_per_rooms)
 
+    def _draw_percentage_per_rooms(self, time_per_room):
         # Calculate total usage time across all rooms
         total_time = sum(time_per_room.values())
 
         # Calculate percentage usage for each room
         percentage_per_room = {room: (time / total_time) * 100 for room, time in time_per_room.items()}
 
-        # Sort rooms by percentage in descending order
-        sorted_percentage_per_room = dict(sorted(
-            percentage_per_room.items(),
-            key=lambda item: item[1],
-            reverse=self.sort_descending  # Use the state variable
-        ))
-
-        limited_sorted_data = self.db_manager.fetch_limited_data(sorted_percentage_per_room)
+        # Keep only the displayed rooms (partial selection, percentages stay relative to all rooms)
+        limited_sorted_data = self.db_manager.top_items(
+            percentage_per_room, self.db_manager.limit, self.sort_descending)
 
         # Create QBarSet and categories using sorted data
         bar_set = QBarSet("Pourcentage d'utilisation")
@@ -591,19 +745,13 @@ class BarChart(QMainWindow):
         self.last_value_sorted_chart_function = self.time_per_rooms_stats  # Store function reference
         if self.stackedWidget.currentWidget() == self.page_2:
             self.stackedWidget.setCurrentWidget(self.page)
-        # Fetch all data
-        time_per_room = self.db_manager.fetch_time_per_rooms_stats()
-
-        # Sort all data by total time in descending order
-        sorted_time_per_room = dict(sorted(
-            time_per_room.items(),
-            key=lambda item: item[1],
-            reverse=self.sort_descending  # Use the state variable
-        ))
-
-        # Apply limit to sorted data
-        limited_sorted_data = self.db_manager.fetch_limited_data(sorted_time_per_room)
+        # Fetch only the displayed rooms, sorted and limited by the query
+        limit, descending = self.db_manager.limit, self.sort_descending
+        self._request_chart(
+            lambda db_manager: db_manager.fetch_time_per_rooms_stats(limit=limit, descending=descending),
+            self._draw_time_per_rooms)
 
+    def _draw_time_per_rooms(self, limited_sorted_data):
         # Create QBarSet and categories using limited and sorted data
         bar_set = QBarSet("Temps d'utilisation par salles (en heures)")
         categories = []
@@ -688,13 +836,14 @@ class BarChart(QMainWindow):
         if not selected_room:
             return  # Do nothing if no room is selected
 
-        # Fetch data from DBManager
-        monthly_usage_data = self.db_manager.fetch_monthly_usage_per_room()
+        # Fetch the pre-aggregated months of the selected room only
+        self._request_chart(
+            lambda db_manager: db_manager.fetch_monthly_usage_per_room(selected_room),
+            lambda monthly_usage_data: self._draw_monthly_usage_per_room(selected_room, monthly_usage_data))
 
-        # Filter data for the selected room
+    def _draw_monthly_usage_per_room(self, selected_room, monthly_usage_data):
         if selected_room not in monthly_usage_data:
             return  # Do nothing if the selected room has no data
-        monthly_usage_data = {selected_room: monthly_usage_data[selected_room]}
 
         # Prepare data for the graph
         categories = set()  # Contains all months
@@ -824,7 +973,9 @@ class BarChart(QMainWindow):
         if layout and layout.count() > 0:
             # Suppose que le graphique est dans un QScrollArea qui est le premier widget
             scroll_area = layout.itemAt(0).widget()
-            if isinstance(scroll_area, QScrollArea):
+            if isinstance(scroll_area, WindowedBarChart):
+                chart_view = scroll_area.chart_view  # Graphique virtualisé : les rangs affichés
+            elif isinstance(scroll_area, QScrollArea):
                 widget_inside = scroll_area.widget()
                 if isinstance(widget_inside, QChartView):
                     chart_view = widget_inside # C'est le widget que nous voulons
@@ -0,0 +1,166 @@
+# check_columnar_stats.py
+# Vérifie que le moteur en colonnes (columnar_stats.py) donne exactement les mêmes statistiques que les requêtes SQL
+# de DBManager (valeurs, types et ordre des clés), puis compare les temps de calcul.
+# Sans base indiquée, la vérification porte sur une base temporaire construite à partir de log_test.LOG
+# et de cas limites générés (voir edge_case_lines) ; une base existante peut être vérifiée en plus avec --db.
+# Utilisation : python check_columnar_stats.py [--db logs.db] [--repeat 5]
+import os
+import sys
+import json
+import timeit
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from db_manager import DBManager
+from log_importer import LogImporter
+from columnar_stats import ColumnarStats, NUMPY_AVAILABLE
+
+LOG_TEST_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "log_test.LOG")
+
+# Méthodes comparées et jeux de paramètres
+CHECKS = [
+    ('fetch_computer_usage_seconds', {}),
+    ('fetch_computer_usage_seconds', {'limit': 5}),
+    ('fetch_computer_usage_seconds', {'limit': 5, 'descending': False}),
+    ('fetch_computer_usage_seconds', {'limit': 5, 'offset': 3}),
+    ('fetch_computer_usage_seconds', {'descending': False, 'offset': 2}),
+    ('fetch_computer_usage', {}),
+    ('fetch_total_usage_seconds', {}),
+    ('fetch_users_per_computer', {}),
+    ('fetch_users_per_computer', {'limit': 5, 'descending': False}),
+    ('fetch_users_per_computer', {'limit': 4, 'offset': 6}),
+    ('fetch_time_by_computer_day_week_month', {}),
+    ('fetch_all_rooms', {}),
+    ('fetch_users_per_rooms_stats', {}),
+    ('fetch_users_per_rooms_stats', {'limit': 3}),
+    ('fetch_time_per_rooms_stats', {}),
+    ('fetch_time_per_rooms_stats', {'limit': 3, 'descending': False}),
+    ('fetch_monthly_usage_per_room', {}),
+]
+
+
+def edge_case_lines() -> list:
+    # Lignes de logs des cas limites du couplage LOGON/LOGOFF et des agrégats par période et par salle.
+    lines = []
+
+    def add(event, when, computer, user):
+        lines.append(f'[{event}] {when:%d/%m/%Y %H:%M:%S} Computer="{computer}" User="FIXTURE\\{user}"\n')
+
+    day = datetime(2024, 11, 5, 10, 0, 0)
+    # LOGON et LOGOFF dans la même seconde : le LOGON est couplé au LOGOFF suivant, pas à celui-là
+    add('LOGON.', day, 'PC-EDGE-01', 'alice')
+    add('LOGOFF', day, 'PC-EDGE-01', 'alice')
+    add('LOGOFF', day + timedelta(hours=1), 'PC-EDGE-01', 'alice')
+    # Même seconde sans LOGOFF ultérieur : aucune session
+    add('LOGON.', day, 'PC-EDGE-02', 'bob')
+    add('LOGOFF', day, 'PC-EDGE-02', 'bob')
+    # Plus de 24 heures (ignorée) et exactement 24 heures (retenue)
+    add('LOGON.', day, 'PC-EDGE-03', 'carol')
+    add('LOGOFF', day + timedelta(days=1, seconds=1), 'PC-EDGE-03', 'carol')
+    add('LOGON.', day, 'PC-EDGE-04', 'dave')
+    add('LOGOFF', day + timedelta(days=1), 'PC-EDGE-04', 'dave')
+    # LOGON jamais fermé
+    add('LOGON.', day, 'PC-EDGE-04', 'erin')
+    # Postes sans salle (nom purement numérique)
+    for computer, user in (('4242', 'frank'), ('0815', 'grace'), ('4242', 'grace')):
+        add('LOGON.', day + timedelta(hours=2), computer, user)
+        add('LOGOFF', day + timedelta(hours=3, minutes=17), computer, user)
+    # Semaines à cheval sur deux années (%W : semaine 00 ou 53) et session qui passe minuit le 31 décembre
+    for when in (datetime(2023, 12, 31, 9), datetime(2024, 1, 1, 9), datetime(2024, 12, 30, 9),
+                 datetime(2024, 12, 31, 23, 30), datetime(2025, 1, 1, 9), datetime(2025, 1, 5, 9)):
+        add('LOGON.', when, 'PC-EDGE-05', 'henri')
+        add('LOGOFF', when + timedelta(minutes=45), 'PC-EDGE-05', 'henri')
+    return lines
+
+
+def build_fixture(directory: str) -> str:
+    # Importe log_test.LOG et les cas limites dans une nouvelle base du dossier ; retourne son chemin.
+    edge_case_file = os.path.join(directory, "cas_limites.LOG")
+    with open(edge_case_file, "w", encoding="utf-8") as file:
+        file.writelines(edge_case_lines())
+    db_path = os.path.join(directory, "check_columnar_stats.db")
+    db_manager = DBManager(db_path=db_path)
+    try:
+        LogImporter(db_manager).import_files([LOG_TEST_FILE, edge_case_file])
+    finally:
+        db_manager.close()
+    return db_path
+
+
+def compare(db_manager: DBManager, engine: ColumnarStats) -> list:
+    # Retourne la liste des écarts entre le chemin SQL et le moteur en colonnes (vide si tout est identique).
+    # La comparaison JSON tient compte de l'ordre des clés et distingue 1 de 1.0.
+    mismatches = []
+    checks = list(CHECKS)
+    for room in db_manager.fetch_all_rooms()[:3]:
+        checks.append(('fetch_monthly_usage_per_room', {'room': room}))
+    for name, kwargs in checks:
+        expected = json.dumps(getattr(db_manager, name)(**kwargs))
+        actual = json.dumps(getattr(engine, name)(**kwargs))
+        if expected != actual:
+            mismatches.append(f"{name}({kwargs}) : SQL {expected[:200]} != colonnes {actual[:200]}")
+    return mismatches
+
+
+def check_database(db_path: str, repeat: int) -> bool:
+    # Compare les deux chemins sur la base db_path et affiche les temps ; retourne False en cas d'écart.
+    db_manager = DBManager(db_path=db_path)
+    try:
+        engine = ColumnarStats(db_manager)
+        if not len(engine.session_start):
+            print(f"ERREUR : aucune session valide dans '{db_path}', rien à comparer")
+            return False
+        mismatches = compare(db_manager, engine)
+        if mismatches:
+            print(f"ERREUR : le moteur en colonnes diffère du chemin SQL sur '{db_path}'")
+            for mismatch in mismatches:
+                print(" ", mismatch)
+            return False
+
+        def run_sql():
+            # Mesure les requêtes et non le cache des résultats : le changement de génération l'invalide en entier
+            # (méthodes appelées et méthodes en cache qu'elles appellent)
+            db_manager.connections.bump_generation()
+            for name, kwargs in CHECKS:
+                getattr(db_manager, name)(**kwargs)
+
+        def run_columnar():
+            for name, kwargs in CHECKS:
+                getattr(engine, name)(**kwargs)
+
+        sql_time = min(timeit.repeat(run_sql, number=1, repeat=repeat))
+        load_time = min(timeit.repeat(lambda: ColumnarStats(db_manager), number=1, repeat=repeat))
+        columnar_time = min(timeit.repeat(run_columnar, number=1, repeat=repeat))
+        print(f"{db_path} : {len(engine.ts)} événements, {len(engine.session_start)} sessions valides : "
+              "résultats identiques")
+        print(f"SQL (tables d'agrégats)         : {sql_time * 1000:8.2f} ms")
+        print(f"colonnes, chargement + couplage : {load_time * 1000:8.2f} ms")
+        print(f"colonnes, statistiques          : {columnar_time * 1000:8.2f} ms")
+        return True
+    finally:
+        db_manager.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare le moteur en colonnes aux requêtes SQL de DBManager.")
+    parser.add_argument('--db', help="base existante à vérifier en plus de la base de test")
+    parser.add_argument('--repeat', type=int, default=5, help="répétitions des mesures de temps (défaut : 5)")
+    args = parser.parse_args()
+    if not NUMPY_AVAILABLE:
+        print("ERREUR : NumPy n'est pas installé")
+        sys.exit(1)
+    if args.db and not os.path.exists(args.db):
+        # DBManager créerait une base vide, que la comparaison validerait sans rien vérifier
+        print(f"ERREUR : la base '{args.db}' n'existe pas")
+        sys.exit(1)
+
+    with tempfile.TemporaryDirectory() as directory:
+        ok = check_database(build_fixture(directory), args.repeat)
+    if ok and args.db:
+        ok = check_database(args.db, args.repeat)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
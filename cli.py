@@ -0,0 +1,192 @@
+# cli.py
+# Point d'entrée en ligne de commande, sans Qt : import de logs et export des statistiques.
+# Exemples :
+#   python cli.py import --db logs.db /srv/logs/logon.log /srv/logs/archives
+#   python cli.py stats computer-usage --db logs.db --format csv --output usage.csv
+#   python cli.py stats time-per-room --db logs.db --engine columnar
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+from db_manager import DBManager
+from log_importer import LogImporter, collect_log_files
+from log_watcher import LogWatcher
+from columnar_stats import ColumnarStats, NUMPY_AVAILABLE
+
+
+# Statistiques exportables : nom en ligne de commande -> méthode fetch_* de DBManager
+STATS = {
+    'sessions': 'fetch_sessions',
+    'computers': 'fetch_all_computers',
+    'computer-usage': 'fetch_computer_usage',
+    'users-per-computer': 'fetch_users_per_computer',
+    'time-by-computer': 'fetch_time_by_computer_day_week_month',
+    'rooms': 'group_computers_by_room',
+    'users-per-room': 'fetch_users_per_rooms_stats',
+    'time-per-room': 'fetch_time_per_rooms_stats',
+    'monthly-usage-per-room': 'fetch_monthly_usage_per_room',
+}
+
+
+def command_import(args) -> int:
+    # Importe les fichiers et affiche le débit obtenu.
+    missing = [path for path in args.paths if not os.path.exists(path)]
+    if missing:
+        for path in missing:
+            print(f"Chemin introuvable : {path}", file=sys.stderr)
+        return 1
+    file_names = collect_log_files(args.paths, args.recursive)
+    if not file_names:
+        print("Aucun fichier de logs à importer.", file=sys.stderr)
+        return 1
+
+    db_manager = DBManager(db_path=args.db)
+    importer = LogImporter(
+        db_manager,
+        on_file_started=(lambda file_name: print(f"Import de {file_name}...", file=sys.stderr)) if args.verbose else None,
+        bulk_load=args.bulk,
+    )
+    start = time.perf_counter()
+    try:
+        result = importer.import_files(file_names)
+    finally:
+        db_manager.close()
+    elapsed = max(time.perf_counter() - start, 1e-9)
+
+    # Le débit ne compte que les octets analysés : ni les fichiers déjà importés ou ignorés, ni les préfixes repris
+    megabytes = result['parsed_bytes'] / 1048576
+    print(f"{len(result['imported_files'])} fichier(s) importé(s), "
+          f"{len(result['already_imported_files'])} déjà importé(s), "
+          f"{len(result['duplicate_files'])} copie(s) identique(s) ignorée(s)")
+    if result['resumed_files']:
+        print(f"{len(result['resumed_files'])} fichier(s) repris depuis le précédent import")
+    if result['rewritten_files']:
+        print(f"{len(result['rewritten_files'])} fichier(s) réécrit(s) ou remplacé(s), réimporté(s) depuis le début")
+    print(f"{result['lines']} lignes, {megabytes:.1f} Mo analysés en {elapsed:.2f} s "
+          f"({result['lines'] / elapsed:,.0f} lignes/s, {megabytes / elapsed:.1f} Mo/s)")
+    print(f"{result['inserted']} sessions ajoutées, {result['duplicates']} doublons ignorés")
+    if result['failed_files']:
+        print(f"{len(result['failed_files'])} fichier(s) illisible(s), non importé(s) :", file=sys.stderr)
+        for file_name, message in result['failed_files']:
+            print(f"  {file_name} : {message}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def command_watch(args) -> int:
+    # Surveille un dossier et importe les nouvelles lignes jusqu'à interruption (Ctrl+C).
+    # La base est créée si besoin, comme pour import ; seul le dossier surveillé doit exister.
+    if not os.path.isdir(args.directory):
+        print(f"Dossier introuvable : {args.directory}", file=sys.stderr)
+        return 1
+    db_manager = DBManager(db_path=args.db)
+    watcher = LogWatcher(db_manager, args.directory, args.recursive)
+    print(f"Surveillance de {args.directory} toutes les {args.interval} s (Ctrl+C pour arrêter)", file=sys.stderr)
+    try:
+        while True:
+            result = watcher.poll()
+            if result and result['new_sessions']:
+                print(f"{time.strftime('%H:%M:%S')} : {sum(result['new_sessions'].values())} nouvelles sessions "
+                      f"({len(result['imported_files'])} fichier(s))")
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db_manager.close()
+    return 0
+
+
+def _flatten(data, prefix=()):
+    # Aplatit un résultat fetch_* (dict imbriqué, liste de tuples ou de valeurs) en lignes CSV.
+    if isinstance(data, dict):
+        for key, value in data.items():
+            yield from _flatten(value, prefix + (key,))
+    elif isinstance(data, (list, tuple)) and prefix and not any(isinstance(item, (list, tuple, dict)) for item in data):
+        # Liste de valeurs rattachée à une clé (ex. postes d'une salle) : une ligne par valeur
+        for item in data:
+            yield prefix + (item,)
+    elif isinstance(data, (list, tuple)):
+        for item in data:
+            yield prefix + (tuple(item) if isinstance(item, (list, tuple)) else (item,))
+    else:
+        yield prefix + (data,)
+
+
+def command_stats(args) -> int:
+    # Exporte une statistique au format JSON ou CSV.
+    if not os.path.exists(args.db):
+        # DBManager créerait une base vide et la statistique serait exportée vide sans erreur
+        print(f"Base introuvable : {args.db}", file=sys.stderr)
+        return 1
+    method = STATS[args.name]
+    db_manager = DBManager(db_path=args.db)
+    try:
+        source = db_manager
+        if args.engine == 'columnar':
+            if NUMPY_AVAILABLE:
+                engine = ColumnarStats(db_manager)
+                # Les statistiques que le moteur en colonnes ne calcule pas restent lues en SQL
+                if hasattr(engine, method):
+                    source = engine
+            else:
+                print("NumPy n'est pas installé : statistique calculée en SQL", file=sys.stderr)
+        data = getattr(source, method)()
+    finally:
+        db_manager.close()
+
+    output = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        if args.format == 'json':
+            json.dump(data, output, ensure_ascii=False, indent=2)
+            output.write("\n")
+        else:
+            writer = csv.writer(output)
+            for row in _flatten(data):
+                writer.writerow(row)
+    finally:
+        if args.output:
+            output.close()
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Import des logs de connexion et statistiques, sans interface graphique.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help="importe des fichiers ou des dossiers de logs")
+    import_parser.add_argument('paths', nargs='+', help="fichiers .log ou dossiers")
+    import_parser.add_argument('--db', default='logs.db', help="chemin de la base SQLite (défaut : logs.db, celle de main.py --persistent)")
+    import_parser.add_argument('-r', '--recursive', action='store_true', help="parcourt aussi les sous-dossiers")
+    import_parser.add_argument('-v', '--verbose', action='store_true', help="affiche chaque fichier importé")
+    import_parser.add_argument('--bulk', action='store_true',
+                               help="chargement en masse : index reconstruits une seule fois à la fin (premier import volumineux)")
+    import_parser.set_defaults(func=command_import)
+
+    watch_parser = subparsers.add_parser('watch', help="surveille un dossier et importe les lignes ajoutées")
+    watch_parser.add_argument('directory', help="dossier de logs à surveiller")
+    watch_parser.add_argument('--db', default='logs.db', help="chemin de la base SQLite (défaut : logs.db, celle de main.py --persistent)")
+    watch_parser.add_argument('-r', '--recursive', action='store_true', help="surveille aussi les sous-dossiers")
+    watch_parser.add_argument('--interval', type=float, default=5.0, help="intervalle de scrutation en secondes")
+    watch_parser.set_defaults(func=command_watch)
+
+    stats_parser = subparsers.add_parser('stats', help="exporte une statistique en JSON ou CSV")
+    stats_parser.add_argument('name', choices=sorted(STATS), help="statistique à exporter")
+    stats_parser.add_argument('--db', default='logs.db', help="chemin de la base SQLite (défaut : logs.db, celle de main.py --persistent)")
+    stats_parser.add_argument('--format', choices=('json', 'csv'), default='json')
+    stats_parser.add_argument('--engine', choices=('sql', 'columnar'), default='sql',
+                              help="moteur de calcul : requêtes SQL (défaut) ou colonnes NumPy, "
+                                   "avec repli sur SQL si NumPy n'est pas installé")
+    stats_parser.add_argument('-o', '--output', help="fichier de sortie (défaut : sortie standard)")
+    stats_parser.set_defaults(func=command_stats)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+# columnar_stats.py
+from datetime import datetime, timedelta
+from db_manager import DBManager, LOGON_ID, LOGOFF_ID, MAX_SESSION_SECONDS
+
+try:
+    import numpy as np
+except ImportError:  # NumPy est optionnel : sans lui, les statistiques restent calculées en SQL
+    np = None
+
+NUMPY_AVAILABLE = np is not None
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class ColumnarStats:
+    # Moteur de statistiques en mémoire : les sessions sont chargées une fois en colonnes NumPy
+    # (codes catégoriels des postes et des utilisateurs, dates en secondes epoch int64) et les statistiques
+    # sont calculées par opérations vectorisées au lieu de requêtes SQL ligne à ligne.
+    # Le couplage LOGON/LOGOFF est fait par tri et searchsorted, les agrégats par bincount et unique.
+    # Chaque méthode rend exactement le même résultat (valeurs, types et ordre) que la méthode fetch_*
+    # homonyme de DBManager ; check_columnar_stats.py le vérifie sur une base de test (cas limites compris).
+
+    def __init__(self, db_manager: DBManager):
+        if np is None:
+            raise ImportError("Le moteur de statistiques en colonnes nécessite NumPy (pip install numpy)")
+        conn = db_manager.conn
+        computers = conn.execute("SELECT id, name, room FROM computers ORDER BY id").fetchall()
+        users = conn.execute("SELECT id FROM users ORDER BY id").fetchall()
+        self.computer_names = [name for _, name, _ in computers]
+        self.computer_rooms = [room for _, _, room in computers]
+        computer_ids = np.array([row[0] for row in computers], dtype=np.int64)
+        user_ids = np.array([row[0] for row in users], dtype=np.int64)
+
+        events = np.fromiter(
+            conn.execute("SELECT computer_id, user_id, ts, event_id FROM session_events"),
+            dtype=np.dtype([('computer', np.int64), ('user', np.int64), ('ts', np.int64), ('event', np.int64)]),
+        )
+        # Codes denses 0..n-1 dans l'ordre des id (les id des dimensions peuvent avoir des trous)
+        self.computer = np.searchsorted(computer_ids, events['computer'])
+        self.user = np.searchsorted(user_ids, events['user'])
+        self.ts = events['ts']
+        self.event = events['event']
+        self.n_computers = len(computer_ids)
+        self.n_users = len(user_ids)
+        self._pair_sessions()
+
+    def _pair_sessions(self):
+        # Couple chaque LOGON avec le premier LOGOFF strictement postérieur du même utilisateur sur le même poste.
+        # Les dates sont remplacées par leur rang et combinées au couple (poste, utilisateur) en une clé int64
+        # unique, sans débordement ; un searchsorted à droite dans les clés triées des LOGOFF trouve le suivant.
+        pair = self.computer * self.n_users + self.user
+        _, pair_code = np.unique(pair, return_inverse=True)
+        ts_values, ts_rank = np.unique(self.ts, return_inverse=True)
+        key = pair_code.astype(np.int64) * len(ts_values) + ts_rank
+
+        is_logon = self.event == LOGON_ID
+        logoff_keys = key[self.event == LOGOFF_ID]
+        logoff_order = np.argsort(logoff_keys, kind='stable')
+        logoff_keys = logoff_keys[logoff_order]
+        logoff_pairs = pair_code[self.event == LOGOFF_ID][logoff_order]
+        logoff_ts = self.ts[self.event == LOGOFF_ID][logoff_order]
+
+        logon_pairs = pair_code[is_logon]
+        position = np.searchsorted(logoff_keys, key[is_logon], side='right')
+        found = position < len(logoff_keys)
+        position[~found] = 0
+        if len(logoff_keys):
+            found &= logoff_pairs[position] == logon_pairs
+
+        start = self.ts[is_logon]
+        duration = np.where(found, logoff_ts[position] if len(logoff_keys) else 0, start) - start
+        # Sessions retenues par les statistiques : fermées par un LOGOFF et d'au plus 24 heures
+        valid = found & (duration <= MAX_SESSION_SECONDS)
+        self.session_computer = self.computer[is_logon][valid]
+        self.session_start = start[valid]
+        self.session_duration = duration[valid]
+        self.logon_computer = self.computer[is_logon]
+        self.logon_user = self.user[is_logon]
+
+    def _day_buckets(self):
+        # Jour de début de chaque session (début du jour UTC, troncature vers zéro comme le % de SQLite)
+        # et tableau des jours distincts : (jours distincts, indice du jour de chaque session).
+        day = self.session_start - np.fmod(self.session_start, 86400)
+        return np.unique(day, return_inverse=True)
+
+    @staticmethod
+    def _period_keys(days, key_format: str):
+        # Clés de période (strftime) des jours distincts, calculées une fois par jour et non par session.
+        return [(_EPOCH + timedelta(seconds=int(day))).strftime(key_format) for day in days]
+
+    def _sum_by(self, codes, size: int, weights):
+        return np.bincount(codes, weights=weights, minlength=size).astype(np.int64)
+
+    def _usage_by_computer(self):
+        return self._sum_by(self.session_computer, self.n_computers, self.session_duration)
+
+    def _select(self, values: dict, limit, descending: bool, offset: int = 0) -> dict:
+        # Tri par valeur puis par nom et coupe aux limit premiers après offset, comme _top_clause de DBManager.
+        if descending:
+            items = sorted(values.items(), key=lambda item: (-item[1], item[0]))
+        else:
+            items = sorted(values.items(), key=lambda item: (item[1], item[0]))
+        items = items[offset:]
+        return dict(items if limit is None or limit < 0 else items[:limit])  # -1 : pas de limite, comme LIMIT -1
+
+    def fetch_computer_usage_seconds(self, limit=None, descending: bool = True, offset: int = 0) -> dict:
+        usage = self._usage_by_computer()
+        has_usage = np.bincount(self.session_computer, minlength=self.n_computers) > 0
+        selected = np.flatnonzero(has_usage)
+        values = {self.computer_names[code]: int(usage[code]) for code in selected}
+        return self._select(values, limit, descending, offset)
+
+    def fetch_computer_usage(self) -> dict:
+        return DBManager.usage_percentages(self.fetch_computer_usage_seconds())
+
+    def fetch_total_usage_seconds(self) -> int:
+        return int(self.session_duration.sum())
+
+    def _distinct_users(self, group, user, size: int):
+        # Nombre d'utilisateurs distincts par groupe : couples (groupe, utilisateur) uniques puis bincount.
+        couples = np.unique(group.astype(np.int64) * self.n_users + user)
+        return np.bincount(couples // self.n_users, minlength=size)
+
+    def fetch_users_per_computer(self, limit=None, descending: bool = True, offset: int = 0) -> dict:
+        counts = self._distinct_users(self.logon_computer, self.logon_user, self.n_computers)
+        selected = np.flatnonzero(counts > 0)
+        values = {self.computer_names[code]: int(counts[code]) for code in selected}
+        return self._select(values, limit, descending, offset)
+
+    def fetch_time_by_computer_day_week_month(self) -> dict:
+        days, day_index = self._day_buckets()
+        time_data = {}
+        for period, key_format in (('Jour', '%Y-%m-%d'), ('Semaine', '%Y-%W'), ('Mois', '%Y-%m')):
+            # Les jours sont regroupés par clé de période, puis les secondes sommées par (poste, période)
+            keys, period_of_day = np.unique(self._period_keys(days, key_format), return_inverse=True)
+            cell = self.session_computer * len(keys) + period_of_day[day_index]
+            seconds = self._sum_by(cell, self.n_computers * len(keys), self.session_duration)
+            for code in np.flatnonzero(np.bincount(cell, minlength=self.n_computers * len(keys))):
+                computer = self.computer_names[code // len(keys)]
+                if computer not in time_data:
+                    time_data[computer] = {'Jour': {}, 'Semaine': {}, 'Mois': {}}
+                time_data[computer][period][str(keys[code % len(keys)])] = int(seconds[code])
+        return time_data
+
+    def _room_codes(self):
+        # Code de salle de chaque poste (-1 sans salle) et liste triée des salles.
+        rooms = sorted({room for room in self.computer_rooms if room is not None})
+        index = {room: code for code, room in enumerate(rooms)}
+        return np.array([index.get(room, -1) for room in self.computer_rooms], dtype=np.int64), rooms
+
+    def fetch_all_rooms(self):
+        return self._room_codes()[1]
+
+    def fetch_users_per_rooms_stats(self, limit=None, descending: bool = True):
+        room_of_computer, rooms = self._room_codes()
+        room = room_of_computer[self.computer]
+        in_room = room >= 0
+        counts = self._distinct_users(room[in_room], self.user[in_room], len(rooms))
+        values = {name: int(counts[code]) for code, name in enumerate(rooms) if counts[code] > 0}
+        return self._select(values, limit, descending)
+
+    def fetch_time_per_rooms_stats(self, limit=None, descending: bool = True):
+        room_of_computer, rooms = self._room_codes()
+        usage = self._usage_by_computer()
+        in_room = room_of_computer >= 0
+        seconds = self._sum_by(room_of_computer[in_room], len(rooms), usage[in_room])
+        values = {name: int(seconds[code]) for code, name in enumerate(rooms)}
+        return {room: (total / 3600 if total else 0) for room, total in self._select(values, limit, descending).items()}
+
+    def fetch_monthly_usage_per_room(self, room: str = None):
+        room_of_computer, rooms = self._room_codes()
+        days, day_index = self._day_buckets()
+        months, month_of_day = np.unique(self._period_keys(days, '%Y-%m'), return_inverse=True)
+        session_room = room_of_computer[self.session_computer]
+        in_room = session_room >= 0
+        cell = session_room[in_room] * len(months) + month_of_day[day_index][in_room]
+        size = len(rooms) * len(months)
+        seconds = self._sum_by(cell, size, self.session_duration[in_room])
+        present = np.bincount(cell, minlength=size) > 0
+        monthly_usage_per_room = {name: {} for name in rooms if room is None or name == room}
+        for code in np.flatnonzero(present):
+            name = rooms[code // len(months)]
+            if name in monthly_usage_per_room:
+                monthly_usage_per_room[name][str(months[code % len(months)])] = int(seconds[code]) / 3600.0
+        return monthly_usage_per_room
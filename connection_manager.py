@@ -0,0 +1,232 @@
+# connection_manager.py
+import copy
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import msvcrt  # Windows
+except ImportError:
+    msvcrt = None
+    import fcntl
+
+
+class ConnectionManager:
+    # Connexions SQLite partagées d'une base (une connexion par thread), verrou d'écriture, génération des données
+    # et cache des résultats de requêtes.
+
+    BUSY_TIMEOUT_MS = 5000  # Attente maximale d'un verrou tenu par un autre processus (CLI)
+    RESULT_CACHE_SIZE = 64  # Nombre maximal de résultats gardés en cache
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.generation = 0
+        self.schema_version = None  # Compteur de schéma SQLite une fois les tables créées et migrées
+        self.bulk_loading = False  # Chargement en masse en cours dans ce processus (index secondaires supprimés)
+        self._local = threading.local()
+        self._open_connections = 0  # Connexions par thread ouvertes, tous threads confondus
+        self._write_lock = threading.Lock()
+        self._generation_lock = threading.Lock()
+        self._memory_connection = None
+        self._result_cache = OrderedDict()
+        self._cache_generation = None
+        self._cache_lock = threading.Lock()
+        self._version_connection = None  # Connexion qui ne sert qu'à lire PRAGMA data_version
+        self._data_version = None
+        self._bulk_lock_file = None
+
+    def connection(self) -> sqlite3.Connection:
+        # Retourne la connexion du thread courant, créée à la première demande (MainWindow et BarChart, dans le
+        # thread de l'interface, partagent la même). Chaque appel doit être équilibré par release().
+        # Le mode WAL évite que les lectures soient bloquées par un import.
+        if self.db_path == ':memory:':
+            # Une base en mémoire n'existe que dans sa connexion : elle est partagée par tous les threads
+            if self._memory_connection is None:
+                self._memory_connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            return self._memory_connection
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.BUSY_TIMEOUT_MS / 1000)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # Suffisant en WAL : un commit reste atomique
+            self._local.conn = conn
+            self._local.references = 0
+            with self._cache_lock:
+                self._open_connections += 1
+        self._local.references += 1
+        return conn
+
+    def release(self):
+        # Libère la connexion du thread courant ; elle est fermée quand plus aucun DBManager du thread ne l'utilise.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        self._local.references -= 1
+        if self._local.references <= 0:
+            self.end_write()
+            conn.close()
+            self._local.conn = None
+            with self._cache_lock:
+                self._open_connections -= 1
+                if self._open_connections == 0:
+                    self._close_version_connection()
+
+    def begin_write(self, timeout: float = -1):
+        # Acquiert le verrou d'écriture pour le thread courant (sans effet s'il le détient déjà) : un seul thread à la
+        # fois garde une transaction d'écriture jusqu'à son commit ou son rollback, les autres attendent leur tour au
+        # lieu d'obtenir "database is locked".
+        # Avec un délai (secondes), lève sqlite3.OperationalError si un autre thread écrit encore à son expiration,
+        # comme SQLite après busy_timeout : le thread de l'interface ne reste pas bloqué derrière un import.
+        if not getattr(self._local, 'writing', False):
+            if not self._write_lock.acquire(timeout=timeout):
+                raise sqlite3.OperationalError("database is locked")
+            self._local.writing = True
+
+    def end_write(self):
+        # Rend le verrou d'écriture après le commit ou le rollback de la transaction du thread courant.
+        if getattr(self._local, 'writing', False):
+            self._local.writing = False
+            self._write_lock.release()
+
+    def _bulk_lock_path(self) -> str:
+        return self.db_path + '-bulk.lock'
+
+    def acquire_bulk_lock(self):
+        # Verrou de fichier tenu pendant tout un chargement en masse : il indique aux autres processus qu'un
+        # chargement est en cours, et le système le libère si le processus meurt (le chargement est alors interrompu).
+        if self.db_path == ':memory:' or self._bulk_lock_file is not None:
+            return
+        file = open(self._bulk_lock_path(), 'a+')
+        for _ in range(20):  # Un autre processus peut tester le verrou au même instant (voir bulk_load_owner_alive)
+            if _try_lock(file):
+                file.seek(0)
+                file.truncate()
+                file.write(str(os.getpid()))  # Pour le diagnostic uniquement
+                file.flush()
+                self._bulk_lock_file = file
+                return
+            time.sleep(0.05)
+        file.close()
+        raise sqlite3.OperationalError("Un chargement en masse est déjà en cours dans un autre processus")
+
+    def release_bulk_lock(self):
+        if self._bulk_lock_file is None:
+            return
+        _unlock(self._bulk_lock_file)
+        self._bulk_lock_file.close()
+        self._bulk_lock_file = None
+        try:
+            os.remove(self._bulk_lock_path())
+        except OSError:
+            pass  # Ouvert par un autre processus qui le teste : il sera réutilisé
+
+    def bulk_load_owner_alive(self) -> bool:
+        # Vrai si un chargement en masse est en cours, dans ce processus ou dans un autre (verrou de fichier tenu).
+        if self.bulk_loading:
+            return True
+        if self.db_path == ':memory:' or not os.path.exists(self._bulk_lock_path()):
+            return False
+        try:
+            file = open(self._bulk_lock_path(), 'a+')
+        except OSError:
+            return False
+        with file:
+            if _try_lock(file):
+                _unlock(file)
+                return False
+            return True
+
+    def bump_generation(self) -> int:
+        # Passe à la génération suivante des données (les résultats en cache deviennent périmés) et la retourne.
+        with self._generation_lock:
+            self.generation += 1
+            return self.generation
+
+    def _check_data_version(self):
+        # Passe à la génération suivante si une autre connexion a validé des données depuis le dernier appel :
+        # les commits d'un autre processus (cli.py import ou watch) n'incrémentent pas la génération eux-mêmes.
+        # data_version est lu sur une connexion à part qui n'écrit jamais, fermée avec la dernière connexion des
+        # threads pour que plus rien ne tienne le fichier (suppression de la base à la fermeture).
+        # data_version change à chaque commit d'une autre connexion, de ce processus (la génération a alors déjà
+        # changé, l'incrément de plus est sans effet sur les résultats) ou d'un autre processus.
+        if self.db_path == ':memory:':
+            return
+        if self._version_connection is None:
+            self._version_connection = sqlite3.connect(self.db_path, timeout=self.BUSY_TIMEOUT_MS / 1000,
+                                                       check_same_thread=False)
+        data_version = self._version_connection.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            if self._data_version is not None:
+                self.bump_generation()
+            self._data_version = data_version
+
+    def _close_version_connection(self):
+        # Ferme la connexion de data_version (appelé sous _cache_lock). Les commits d'autres processus ne sont plus
+        # suivis jusqu'à sa réouverture, et data_version n'est comparable que sur une même connexion :
+        # les résultats en cache deviennent périmés.
+        if self._version_connection is None:
+            return
+        self._version_connection.close()
+        self._version_connection = None
+        self._data_version = None
+        self.bump_generation()
+
+    def cached_result(self, key, compute):
+        # Retourne une copie du résultat en cache pour key, ou le calcule avec compute() hors du verrou.
+        # Le cache est partagé par tous les threads : un graphique calculé dans le pool réutilise un résultat déjà lu.
+        # Un résultat calculé pendant qu'un commit changeait la génération n'est pas gardé ; un résultat calculé
+        # pendant le commit d'un autre processus l'est, mais il est effacé à l'appel suivant (data_version).
+        with self._cache_lock:
+            self._check_data_version()
+            if self._cache_generation != self.generation:
+                self._result_cache.clear()
+                self._cache_generation = self.generation
+            if key in self._result_cache:
+                self._result_cache.move_to_end(key)
+                # Les appelants modifient parfois le résultat (conversion en heures) : le cache garde son exemplaire
+                return copy.deepcopy(self._result_cache[key])
+            generation = self._cache_generation
+        result = compute()
+        with self._cache_lock:
+            if generation == self._cache_generation == self.generation:
+                self._result_cache[key] = copy.deepcopy(result)
+                if len(self._result_cache) > self.RESULT_CACHE_SIZE:
+                    self._result_cache.popitem(last=False)
+        return result
+
+
+def _try_lock(file) -> bool:
+    # Verrou exclusif non bloquant sur le fichier ouvert (premier octet sous Windows).
+    try:
+        if msvcrt is not None:
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(file):
+    if msvcrt is not None:
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_connection_manager(db_path: str) -> ConnectionManager:
+    # Retourne le gestionnaire unique de la base db_path pour tout le processus.
+    key = db_path if db_path == ':memory:' else os.path.abspath(db_path)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = _managers[key] = ConnectionManager(db_path)
+        return manager
@@ -1,360 +1,1195 @@
 # db_manager.py
 import sqlite3
 import re
+import functools
+import heapq
+from datetime import date, datetime, timedelta
+from itertools import islice
+from connection_manager import get_connection_manager
 
 
+# Identifiants fixes des types d'événements (table event_types)
+LOGON_ID = 1
+LOGOFF_ID = 2
+EVENT_IDS = {'LOGON': LOGON_ID, 'LOGOFF': LOGOFF_ID}
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Durée maximale d'une session prise en compte dans les statistiques (24 heures)
+MAX_SESSION_SECONDS = 86400
+
+# Suffixe numérique retiré du nom d'un poste pour obtenir sa salle (ex. PC-LAB-03 -> PC-LAB)
+_ROOM_SUFFIX_PATTERN = re.compile(r'(-W\d{2,}|\b\d+\b)$', flags=re.IGNORECASE)
+
+# Condition des intervalles retenus par les statistiques d'utilisation
+_VALID_INTERVAL = "unmatched = 0 AND over_24h = 0"
+
+# Index secondaires des événements et des intervalles, supprimés pendant un chargement en masse
+# puis reconstruits en une passe à la fin (l'index UNIQUE de session_events, qui dédoublonne, est conservé)
+_SECONDARY_INDEXES = {
+    'idx_session_events_ts': 'session_events (ts)',
+    'idx_session_events_user': 'session_events (user_id)',
+    'idx_session_events_computer': 'session_events (computer_id)',
+    'idx_intervals_pair_start': 'session_intervals (computer_id, user_id, start_ts)',
+    # Index partiel couvrant pour les statistiques : seules les sessions valides y figurent
+    'idx_intervals_valid': f'session_intervals (computer_id, start_ts, duration) WHERE {_VALID_INTERVAL}',
+}
+
+# Version du schéma écrite par ce code, enregistrée dans la table schema_migrations.
+# La version 1 est le schéma actuel, créé (ou rattrapé pour les bases d'avant le versionnement) par _create_tables ;
+# chaque évolution ajoute ici sa méthode de migration depuis la version précédente, appliquée une seule fois.
+SCHEMA_VERSION = 4
+_MIGRATIONS = {  # version -> nom de la méthode DBManager qui migre depuis la version précédente
+    2: '_add_imported_files_content_hash',
+    3: '_add_computers_name_nocase_index',
+    4: '_add_imported_files_tail_hash',
+}
+
+
+class SchemaVersionError(sqlite3.DatabaseError):
+    # La base a été créée par une version plus récente de l'application : elle n'est pas modifiée.
+    pass
+
+
+# Réglages de connexion du chargement en masse, et valeurs rétablies en mode requête
+_BULK_LOAD_PRAGMAS = {'synchronous': 'OFF', 'cache_size': '-131072', 'temp_store': 'MEMORY'}  # cache de 128 Mo
+_QUERY_PRAGMAS = {'synchronous': 'NORMAL', 'cache_size': '-2000', 'temp_store': 'DEFAULT'}
+
+# Tables d'agrégats par période : (table, colonne de la période, expression de la clé affichée, borne de date)
+_PERIOD_ROLLUPS = {
+    'Jour': ('usage_daily', 'day', "date(day, 'unixepoch')", "CAST(strftime('%s', ?) AS INTEGER)"),
+    'Semaine': ('usage_weekly', 'week', 'week', "strftime('%Y-%W', ?)"),
+    'Mois': ('usage_monthly', 'month', 'month', "strftime('%Y-%m', ?)"),
+}
+
+
+def room_for_computer(computer: str):
+    # Salle d'un poste : son nom sans les suffixes purement numériques (None si le nom devient vide).
+    normalized = _ROOM_SUFFIX_PATTERN.sub('', computer, count=1)
+    normalized = normalized.rstrip("-")  # Supprime le tiret à la fin si présent
+    return normalized or None
+
+
+# Recherche : filtres "champ:valeur" reconnus (la valeur peut être entre guillemets) et colonne correspondante
+_SEARCH_FIELD_PATTERN = re.compile(r'\b(computer|user|event|date):("[^"]*"|\S+)', flags=re.IGNORECASE)
+_TIMESTAMP_CHARS = frozenset("0123456789-: %_")
+# Préfixes de date acceptés pour une recherche par plage de ts (longueur -> format)
+_TIMESTAMP_PREFIX_FORMATS = {4: '%Y', 7: '%Y-%m', 10: '%Y-%m-%d', 13: '%Y-%m-%d %H', 16: '%Y-%m-%d %H:%M', 19: '%Y-%m-%d %H:%M:%S'}
+
+# Ordres de tri de la liste des sessions : colonne de tri (départagée par l'id) et index qui fournit cet ordre
+# (idx_session_events_ts, autoindex de computers.name + idx_session_events_computer, autoindex de users.name
+# + idx_session_events_user). Pour les tris par nom, l'ordre des jointures est imposé (_SESSION_ORDER_DRIVERS) :
+# sans statistiques (base jamais analysée), l'optimiseur parcourrait sinon session_events en entier et trierait
+# le résultat dans un B-tree temporaire avant de rendre la première page.
+SESSION_ORDERS = {
+    'id': None,
+    'date': 's.ts',
+    'computer': 'c.name',
+    'name': 'u.name',
+}
+# Table parcourue en premier, par son index sur le nom, pour les tris par poste et par utilisateur
+_SESSION_ORDER_DRIVERS = {'computer': 'computers c', 'name': 'users u'}
+# Jointures des dimensions de la liste des sessions
+_SESSION_JOINS = {'computers c': 'c.id = s.computer_id', 'users u': 'u.id = s.user_id'}
+# Position dans une ligne (id, event, timestamp, computer, user) de la valeur de tri de chaque ordre
+_SESSION_ORDER_FIELDS = {'date': 2, 'computer': 3, 'name': 4}
+
+
+def parse_search_query(query: str):
+    # Sépare une recherche en texte libre et filtres par champ : "computer:PC-LAB garcia" -> ('garcia', [('computer', 'PC-LAB')]).
+    filters = [(field.lower(), value.strip('"')) for field, value in _SEARCH_FIELD_PATTERN.findall(query)]
+    free_text = _SEARCH_FIELD_PATTERN.sub(' ', query).strip()
+    return free_text, filters
+
+
+def _timestamp_range(prefix: str):
+    # Plage [début, fin) en secondes epoch des dates commençant par prefix ("2024", "2024-11-05 08"...), ou None.
+    date_format = _TIMESTAMP_PREFIX_FORMATS.get(len(prefix))
+    if date_format is None:
+        return None
+    try:
+        start = datetime.strptime(prefix, date_format)
+    except ValueError:
+        return None
+    if len(prefix) == 4:
+        end = start.replace(year=start.year + 1)
+    elif len(prefix) == 7:
+        end = (start + timedelta(days=31)).replace(day=1)
+    else:
+        end = start + {10: timedelta(days=1), 13: timedelta(hours=1), 16: timedelta(minutes=1), 19: timedelta(seconds=1)}[len(prefix)]
+    epoch = datetime(1970, 1, 1)
+    return int((start - epoch).total_seconds()), int((end - epoch).total_seconds())
+
+
+def _freeze(value):
+    # Rend un paramètre de requête utilisable comme clé de cache (les ensembles de postes par exemple).
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def cached_query(method):
+    # Met en cache le résultat d'une méthode fetch_* selon ses paramètres, jusqu'au prochain changement de données.
+    # Cache et génération sont portés par le ConnectionManager de la base : un import validé dans un thread
+    # invalide aussi les résultats calculés dans les autres.
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, _freeze(args), _freeze(tuple(sorted(kwargs.items()))))
+        return self._cached_result(key, lambda: method(self, *args, **kwargs))
+    return wrapper
+
 
 class DBManager:
-    # Classe pour gérer les opérations sur la base de données SQLite.
+    # Classe pour gérer les opérations sur la base de données SQLite : import des sessions, recherche et statistiques.
+    # Les connexions viennent du ConnectionManager partagé de la base (une connexion par thread).
 
     def __init__(self, db_path: str):
         self.db_path = db_path
-        self.conn = sqlite3.connect(self.db_path)
+        self.connections = get_connection_manager(db_path)
+        self.conn = self.connections.connection()
         self.cursor = self.conn.cursor()
-        self._create_tables()
+        # Caches nom -> id des dimensions, valables tant qu'aucune autre écriture n'a eu lieu (voir _begin_write)
+        self._computer_ids = {}
+        self._user_ids = {}
+        self._ids_version = None
+        self._day_epochs = {}
+        if self._schema_version() != self.connections.schema_version:
+            # Le schéma n'est vérifié (et migré) qu'à la première ouverture de la base dans le processus,
+            # ou si le fichier a été remplacé depuis (le compteur de schéma de SQLite a changé).
+            # Une base déjà à jour est ouverte sans transaction d'écriture (lecture seule, écrivain concurrent).
+            changes_before = self.conn.total_changes
+            try:
+                if not self._schema_up_to_date():
+                    self._create_tables()
+            except Exception:
+                self.conn.rollback()
+                self.connections.end_write()
+                self.connections.release()
+                raise
+            self.connections.schema_version = self._schema_version()
+            if self.conn.total_changes != changes_before:
+                self.connections.bump_generation()  # Migration du schéma à l'ouverture
+        self.search_tables = self._find_search_tables()
         self.limit = None
+        self._committed_changes = self.conn.total_changes
+
+    def _schema_version(self) -> int:
+        # Compteur de SQLite incrémenté à chaque modification du schéma
+        return self.conn.execute("PRAGMA schema_version").fetchone()[0]
+
+    def _schema_up_to_date(self) -> bool:
+        # Vrai si la base est à la version courante et qu'aucun chargement en masse n'est à terminer
+        # (mode requête, ou chargement en cours dans un processus vivant) : _create_tables n'aurait rien à faire.
+        if self._stored_schema_version() != SCHEMA_VERSION:
+            return False
+        return self._get_metadata('mode') != 'bulk_load' or self.connections.bulk_load_owner_alive()
 
     def _create_tables(self):
-        # Crée les tables nécessaires dans la base de données.
+        # Crée les tables nécessaires dans la base de données, ou migre une base plus ancienne (version inscrite dans
+        # schema_migrations) ; une base plus récente est refusée (SchemaVersionError).
+        self._begin_write()
+        stored_version = self._stored_schema_version()
+        if stored_version > SCHEMA_VERSION:
+            raise SchemaVersionError(
+                f"La base '{self.db_path}' est au schéma version {stored_version}, "
+                f"cette version de l'application ne connaît que la version {SCHEMA_VERSION}."
+            )
+        self.cursor.execute("SELECT type FROM sqlite_master WHERE name = 'sessions'")
+        row = self.cursor.fetchone()
+        legacy_sessions = row is not None and row[0] == 'table'
+        if legacy_sessions:
+            # Ancien schéma : la table texte est renommée puis recopiée dans le schéma compact
+            self.cursor.execute("ALTER TABLE sessions RENAME TO sessions_legacy")
+
+        # Postes, utilisateurs et types d'événements sont des dimensions à identifiants entiers, et les dates des
+        # secondes epoch (heure locale des logs, sans fuseau) ; la vue sessions reconstitue les lignes d'origine.
         self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sessions (
+            CREATE TABLE IF NOT EXISTS computers (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE,
+                room TEXT
+            )
+        ''')
+        # La salle de chaque poste est calculée une seule fois, à sa première apparition
+        self.cursor.execute("PRAGMA table_info(computers)")
+        if 'room' not in {row[1] for row in self.cursor.fetchall()}:
+            self.cursor.execute("ALTER TABLE computers ADD COLUMN room TEXT")
+            self._fill_computer_rooms()
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            )
+        ''')
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS event_types (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            )
+        ''')
+        self.cursor.executemany(
+            "INSERT OR IGNORE INTO event_types (id, name) VALUES (?, ?)",
+            [(event_id, name) for name, event_id in EVENT_IDS.items()]
+        )
+        self._create_search_index()
+        # L'index UNIQUE (poste, utilisateur, événement, date) sert aussi au couplage LOGON/LOGOFF
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS session_events (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
-                event TEXT,
-                timestamp TEXT,
-                computer TEXT,
-                user TEXT,
-                UNIQUE(event, timestamp, computer, user)
+                event_id INTEGER NOT NULL REFERENCES event_types (id),
+                ts INTEGER NOT NULL,
+                computer_id INTEGER NOT NULL REFERENCES computers (id),
+                user_id INTEGER NOT NULL REFERENCES users (id),
+                UNIQUE(computer_id, user_id, event_id, ts)
             )
         ''')
+        self.cursor.execute('''
+            CREATE VIEW IF NOT EXISTS sessions AS
+            SELECT
+                s.id AS id,
+                e.name AS event,
+                datetime(s.ts, 'unixepoch') AS timestamp,
+                c.name AS computer,
+                u.name AS user
+            FROM session_events s
+            JOIN event_types e ON e.id = s.event_id
+            JOIN computers c ON c.id = s.computer_id
+            JOIN users u ON u.id = s.user_id
+        ''')
         self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS imported_files (
-                filename TEXT PRIMARY KEY
+                filename TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime_ns INTEGER,
+                offset INTEGER,
+                prefix_hash TEXT
+            )
+        ''')
+        # Les bases créées avant le suivi incrémental n'ont que la colonne filename
+        self.cursor.execute("PRAGMA table_info(imported_files)")
+        columns = {row[1] for row in self.cursor.fetchall()}
+        for column, column_type in (('size', 'INTEGER'), ('mtime_ns', 'INTEGER'), ('offset', 'INTEGER'), ('prefix_hash', 'TEXT')):
+            if column not in columns:
+                self.cursor.execute(f"ALTER TABLE imported_files ADD COLUMN {column} {column_type}")
+        
+        # Intervalles LOGON -> LOGOFF : chaque LOGON est couplé au premier LOGOFF ultérieur du même utilisateur sur
+        # le même poste, à chaque insertion (end_ts et duration sont NULL tant que la session est ouverte)
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'session_intervals'")
+        intervals_missing = self.cursor.fetchone() is None
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS session_intervals (
+                logon_id INTEGER PRIMARY KEY,
+                computer_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                start_ts INTEGER NOT NULL,
+                end_ts INTEGER,
+                duration INTEGER,
+                over_24h INTEGER NOT NULL DEFAULT 0,
+                unmatched INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+
+        # Agrégats du temps d'utilisation valide (en secondes) par poste et par jour/semaine/mois, et par salle et par mois.
+        # Le jour est la date epoch de minuit, la semaine et le mois les clés strftime '%Y-%W' et '%Y-%m'.
+        # Seules les périodes touchées par un import sont recalculées.
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'usage_room_monthly'")
+        rollups_missing = self.cursor.fetchone() is None
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS usage_daily (
+                computer_id INTEGER NOT NULL,
+                day INTEGER NOT NULL,
+                seconds INTEGER NOT NULL,
+                PRIMARY KEY (computer_id, day)
+            ) WITHOUT ROWID
+        ''')
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS usage_weekly (
+                computer_id INTEGER NOT NULL,
+                week TEXT NOT NULL,
+                seconds INTEGER NOT NULL,
+                PRIMARY KEY (computer_id, week)
+            ) WITHOUT ROWID
+        ''')
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS usage_monthly (
+                computer_id INTEGER NOT NULL,
+                month TEXT NOT NULL,
+                seconds INTEGER NOT NULL,
+                PRIMARY KEY (computer_id, month)
+            ) WITHOUT ROWID
+        ''')
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS usage_room_monthly (
+                room TEXT NOT NULL,
+                month TEXT NOT NULL,
+                seconds INTEGER NOT NULL,
+                PRIMARY KEY (room, month)
+            ) WITHOUT ROWID
+        ''')
+        
+        # Mode de la base : 'query' (normal) ou 'bulk_load' pendant un chargement en masse
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS db_metadata (
+                key TEXT PRIMARY KEY,
+                value TEXT
             )
         ''')
+        # Un chargement en masse en cours, dans ce processus ou dans un autre (verrou de fichier tenu), est laissé
+        # tel quel ; sans propriétaire vivant il a été interrompu (plantage) et il est terminé ici
+        bulk_load_active = self.connections.bulk_load_owner_alive()
+        bulk_load_interrupted = self._get_metadata('mode') == 'bulk_load' and not bulk_load_active
         
         # --- AJOUT DES INDEX ---
-        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_computer ON sessions (computer)')
-        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions (user)')
-        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_event ON sessions (event)')
-        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_timestamp ON sessions (timestamp)')
-        # Un index composite pour les sous-requêtes complexes
-        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_comp_user_event_time ON sessions (computer, user, event, timestamp)')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_computers_room ON computers (room)')
+        if not bulk_load_active:
+            self._create_secondary_indexes()
         # --- FIN AJOUT DES INDEX ---
+
+        if legacy_sessions:
+            self._migrate_legacy_sessions()
+        if legacy_sessions or intervals_missing or bulk_load_interrupted:
+            self.rebuild_session_intervals()
+        elif rollups_missing:
+            self.rebuild_usage_rollups()
+        if bulk_load_interrupted:
+            self.cursor.execute("ANALYZE")
+            self._set_metadata('mode', 'query')
+
+        self._migrate_schema(stored_version)
         
         self.conn.commit()
+        self.connections.end_write()
 
-    def is_file_imported(self, filename: str) -> bool:
-        # Vérifie si un fichier a déjà été importé.
-        self.cursor.execute("SELECT filename FROM imported_files WHERE filename = ?", (filename,))
-        return self.cursor.fetchone() is not None
+    def _stored_schema_version(self) -> int:
+        # Version enregistrée dans la base (0 pour une base neuve ou antérieure au versionnement).
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'schema_migrations'")
+        if self.cursor.fetchone() is None:
+            return 0
+        self.cursor.execute("SELECT MAX(version) FROM schema_migrations")
+        return self.cursor.fetchone()[0] or 0
+
+    def _migrate_schema(self, stored_version: int):
+        # Applique dans l'ordre les migrations postérieures à la version enregistrée et les inscrit dans
+        # schema_migrations, dans la transaction de _create_tables (une migration interrompue est annulée en entier).
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                applied_at TEXT NOT NULL
+            )
+        ''')
+        for version in range(stored_version + 1, SCHEMA_VERSION + 1):
+            if version in _MIGRATIONS:
+                getattr(self, _MIGRATIONS[version])()
+            self.cursor.execute(
+                "INSERT INTO schema_migrations (version, applied_at) VALUES (?, datetime('now'))", (version,)
+            )
+
+    def _add_imported_files_content_hash(self):
+        # Version 2 : hash du fichier entier à son import, pour reconnaître une copie identique même quand
+        # sa dernière ligne n'est pas terminée (prefix_hash ne couvre que les lignes complètes)
+        self.cursor.execute("ALTER TABLE imported_files ADD COLUMN content_hash TEXT")
 
-    def mark_file_imported(self, filename: str):
-        # Marque un fichier comme importé dans la base de données.
-        self.cursor.execute("INSERT INTO imported_files (filename) VALUES (?)", (filename,))
+    def _add_computers_name_nocase_index(self):
+        # Version 3 : index des noms de postes sans tenir compte de la casse (fetch_time_by_period) ;
+        # l'index unique de computers.name, en collation BINARY, ne sert pas une comparaison COLLATE NOCASE
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_computers_name_nocase ON computers (name COLLATE NOCASE)")
 
-    def insert_session(self, event: str, timestamp: str, computer: str, user: str):
-        # Insère une session dans la table sessions.
+    def _add_imported_files_tail_hash(self):
+        # Version 4 : hash des derniers octets importés (avant offset), qui vérifie à moindre coût qu'un fichier
+        # a seulement grandi ; les fichiers importés avant cette version sont vérifiés par prefix_hash
+        self.cursor.execute("ALTER TABLE imported_files ADD COLUMN tail_hash TEXT")
+
+    def check_integrity(self) -> list:
+        # Vérifie que la base est saine (PRAGMA quick_check) et à la version de schéma attendue.
+        # Retourne la liste des problèmes trouvés, vide si la base est utilisable.
+        problems = [row[0] for row in self.conn.execute("PRAGMA quick_check") if row[0] != 'ok']
+        stored_version = self._stored_schema_version()
+        if stored_version != SCHEMA_VERSION:
+            problems.append(f"Schéma version {stored_version} au lieu de {SCHEMA_VERSION}")
+        return problems
+
+    def _create_secondary_indexes(self):
+        for name, definition in _SECONDARY_INDEXES.items():
+            self.cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {definition}')
+
+    def _get_metadata(self, key: str):
+        self.cursor.execute("SELECT value FROM db_metadata WHERE key = ?", (key,))
+        row = self.cursor.fetchone()
+        return None if row is None else row[0]
+
+    def _set_metadata(self, key: str, value: str):
+        self.cursor.execute("INSERT OR REPLACE INTO db_metadata (key, value) VALUES (?, ?)", (key, value))
+
+    def _set_pragmas(self, pragmas: dict):
+        for name, value in pragmas.items():
+            self.cursor.execute(f"PRAGMA {name} = {value}")
+
+    def begin_bulk_load(self):
+        # Passe la base en mode chargement en masse, pour un premier import volumineux :
+        # les index secondaires sont supprimés, les intervalles et agrégats ne sont plus tenus à jour à chaque
+        # insertion et la connexion est réglée pour l'écriture (synchronous, cache_size, temp_store).
+        # Le mode est enregistré dans db_metadata et validé tout de suite : après un plantage, la prochaine
+        # ouverture de la base termine le chargement. end_bulk_load() revient au mode requête.
+        if self.connections.bulk_loading:
+            return
+        if self.conn.in_transaction:
+            self.commit()
+        self.connections.acquire_bulk_lock()  # Avant le mode, pour qu'un autre processus ne le croie pas interrompu
         try:
+            self._begin_write()
+        except Exception:
+            self.connections.release_bulk_lock()
+            raise
+        self._set_metadata('mode', 'bulk_load')
+        for name in _SECONDARY_INDEXES:
+            self.cursor.execute(f"DROP INDEX IF EXISTS {name}")
+        self.connections.bulk_loading = True
+        self.commit()
+        self.connections.schema_version = self._schema_version()
+        self._set_pragmas(_BULK_LOAD_PRAGMAS)
+
+    def end_bulk_load(self):
+        # Termine le chargement en masse : intervalles et agrégats recalculés en une passe triée,
+        # index secondaires reconstruits, statistiques de l'optimiseur mises à jour (ANALYZE), mode requête rétabli.
+        if not self.connections.bulk_loading:
+            return
+        if self.conn.in_transaction:
+            self.commit()
+        self._begin_write()
+        self.rebuild_session_intervals()
+        self._create_secondary_indexes()
+        self.cursor.execute("ANALYZE")
+        self._set_metadata('mode', 'query')
+        self.connections.bulk_loading = False
+        self.commit()
+        self.connections.release_bulk_lock()
+        self.connections.schema_version = self._schema_version()
+        self._set_pragmas(_QUERY_PRAGMAS)
+
+    def _create_search_index(self):
+        # Index FTS5 trigrammes des noms de postes et d'utilisateurs (recherche de sous-chaînes LIKE '%q%'),
+        # synchronisés avec les tables de dimension par des triggers d'insertion et de suppression.
+        for table in ('computers', 'users'):
+            fts_table = f"{table}_fts"
+            self.cursor.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (fts_table,))
+            fts_missing = self.cursor.fetchone() is None
+            try:
+                self.cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} "
+                    f"USING fts5(name, content='{table}', content_rowid='id', tokenize='trigram')"
+                )
+            except sqlite3.OperationalError:
+                continue  # SQLite compilé sans FTS5 ou trop ancien pour le tokenizer trigram
+            self.cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {fts_table}_insert AFTER INSERT ON {table} BEGIN
+                    INSERT INTO {fts_table} (rowid, name) VALUES (new.id, new.name);
+                END
+            ''')
+            self.cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {fts_table}_delete AFTER DELETE ON {table} BEGIN
+                    INSERT INTO {fts_table} ({fts_table}, rowid, name) VALUES ('delete', old.id, old.name);
+                END
+            ''')
+            if fts_missing:
+                self.cursor.execute(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')")
+
+    def _find_search_tables(self) -> dict:
+        # Tables interrogées par la recherche pour chaque dimension : l'index FTS5 trigrammes s'il existe (tenu à jour
+        # par des triggers), sinon la table elle-même.
+        self.cursor.execute("SELECT name FROM sqlite_master WHERE name IN ('computers_fts', 'users_fts')")
+        fts_tables = {row[0] for row in self.cursor.fetchall()}
+        return {table: f"{table}_fts" if f"{table}_fts" in fts_tables else table for table in ('computers', 'users')}
+
+    def _fill_computer_rooms(self):
+        # Calcule la salle de tous les postes déjà enregistrés (migration).
+        self.cursor.execute("SELECT id, name FROM computers")
+        self.cursor.executemany(
+            "UPDATE computers SET room = ? WHERE id = ?",
+            [(room_for_computer(name), computer_id) for computer_id, name in self.cursor.fetchall()]
+        )
+
+    def _migrate_legacy_sessions(self):
+        # Recopie l'ancienne table sessions (colonnes texte) dans le schéma compact.
+        self.cursor.execute("INSERT OR IGNORE INTO computers (name) SELECT DISTINCT computer FROM sessions_legacy")
+        self._fill_computer_rooms()
+        self.cursor.execute("INSERT OR IGNORE INTO users (name) SELECT DISTINCT user FROM sessions_legacy")
+        self.cursor.execute('''
+            INSERT OR IGNORE INTO session_events (id, event_id, ts, computer_id, user_id)
+            SELECT s.id, e.id, CAST(strftime('%s', s.timestamp) AS INTEGER), c.id, u.id
+            FROM sessions_legacy s
+            JOIN event_types e ON e.name = s.event
+            JOIN computers c ON c.name = s.computer
+            JOIN users u ON u.name = s.user
+        ''')
+        self.cursor.execute("DROP TABLE sessions_legacy")
+
+    @staticmethod
+    def _pair_events(events):
+        # Couplage par fusion triée : events est trié par (poste, utilisateur, ts décroissant, event_id),
+        # ce qui place un LOGON avant un LOGOFF de même date (le LOGOFF doit être strictement postérieur).
+        # Produit (logon_id, computer_id, user_id, start_ts, end_ts, duration, over_24h, unmatched).
+        current_pair = None
+        next_logoff = None
+        for event_id, computer_id, user_id, ts, event_type in events:
+            if (computer_id, user_id) != current_pair:
+                current_pair = (computer_id, user_id)
+                next_logoff = None
+            if event_type == LOGOFF_ID:
+                next_logoff = ts
+            elif next_logoff is None:
+                yield event_id, computer_id, user_id, ts, None, None, 0, 1
+            else:
+                duration = next_logoff - ts
+                yield event_id, computer_id, user_id, ts, next_logoff, duration, int(duration > MAX_SESSION_SECONDS), 0
+
+    def _insert_intervals(self, events):
+        self.cursor.executemany(
+            "INSERT OR REPLACE INTO session_intervals "
+            "(logon_id, computer_id, user_id, start_ts, end_ts, duration, over_24h, unmatched) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            self._pair_events(events)
+        )
+
+    def rebuild_session_intervals(self):
+        # Reconstruit entièrement session_intervals en un seul passage trié sur session_events.
+        self._begin_write()
+        self.cursor.execute("DELETE FROM session_intervals")
+        events = self.conn.execute(
+            "SELECT id, computer_id, user_id, ts, event_id FROM session_events "
+            "ORDER BY computer_id, user_id, ts DESC, event_id"
+        )
+        self._insert_intervals(events)
+        self.rebuild_usage_rollups()
+
+    def _update_intervals_after(self, last_id: int):
+        # Met à jour session_intervals pour les sessions d'id > last_id. Pour chaque couple (poste, utilisateur)
+        # touché, seuls sont recalculés les LOGON postérieurs à la plus ancienne nouvelle date, et ceux
+        # dont la session était encore ouverte ou se terminait après cette date (un LOGOFF arrivé plus tard les ferme).
+        self.cursor.execute(
+            "SELECT computer_id, user_id, MIN(ts) FROM session_events WHERE id > ? GROUP BY computer_id, user_id",
+            (last_id,)
+        )
+        first_changed_ts = {}  # Par poste, date du plus ancien intervalle recalculé
+        for computer_id, user_id, first_new_ts in self.cursor.fetchall():
+            self.cursor.execute(
+                "SELECT MIN(start_ts) FROM session_intervals "
+                "WHERE computer_id = ? AND user_id = ? AND (end_ts IS NULL OR end_ts > ?)",
+                (computer_id, user_id, first_new_ts)
+            )
+            oldest_open = self.cursor.fetchone()[0]
+            cut_ts = first_new_ts if oldest_open is None else min(oldest_open, first_new_ts)
+            self.cursor.execute(
+                "DELETE FROM session_intervals WHERE computer_id = ? AND user_id = ? AND start_ts >= ?",
+                (computer_id, user_id, cut_ts)
+            )
+            events = self.conn.execute(
+                "SELECT id, computer_id, user_id, ts, event_id FROM session_events "
+                "WHERE computer_id = ? AND user_id = ? AND ts >= ? ORDER BY ts DESC, event_id",
+                (computer_id, user_id, cut_ts)
+            )
+            self._insert_intervals(events)
+            first_changed_ts[computer_id] = min(cut_ts, first_changed_ts.get(computer_id, cut_ts))
+        self._update_usage_rollups(first_changed_ts)
+
+    def rebuild_usage_rollups(self):
+        # Reconstruit entièrement les agrégats d'utilisation à partir de session_intervals, en une requête groupée par table.
+        self._begin_write()
+        for table in ('usage_daily', 'usage_weekly', 'usage_monthly', 'usage_room_monthly'):
+            self.cursor.execute(f"DELETE FROM {table}")
+        self.cursor.execute(f"""
+            INSERT INTO usage_daily (computer_id, day, seconds)
+            SELECT computer_id, start_ts - start_ts % 86400 AS day, SUM(duration)
+            FROM session_intervals
+            WHERE {_VALID_INTERVAL}
+            GROUP BY computer_id, day
+        """)
+        for table, column, key_format in (('usage_weekly', 'week', '%Y-%W'), ('usage_monthly', 'month', '%Y-%m')):
+            self.cursor.execute(f"""
+                INSERT INTO {table} (computer_id, {column}, seconds)
+                SELECT computer_id, strftime('{key_format}', day, 'unixepoch') AS period, SUM(seconds)
+                FROM usage_daily
+                GROUP BY computer_id, period
+            """)
+        self.cursor.execute("""
+            INSERT INTO usage_room_monthly (room, month, seconds)
+            SELECT c.room, m.month, SUM(m.seconds)
+            FROM usage_monthly m
+            JOIN computers c ON c.id = m.computer_id
+            WHERE c.room IS NOT NULL
+            GROUP BY c.room, m.month
+        """)
+
+    def _update_usage_rollups(self, first_changed_ts: dict):
+        # Recalcule, pour chaque poste, les jours, semaines et mois à partir de celui qui contient
+        # first_changed_ts[poste], puis les mois correspondants des salles de ces postes.
+        # Les semaines et mois sont dérivés de usage_daily (quelques centaines de lignes par poste).
+        rooms = {}
+        for computer_id, changed_ts in first_changed_ts.items():
+            first_day = changed_ts - changed_ts % 86400
+            self.cursor.execute("DELETE FROM usage_daily WHERE computer_id = ? AND day >= ?", (computer_id, first_day))
+            self.cursor.execute(f"""
+                INSERT INTO usage_daily (computer_id, day, seconds)
+                SELECT computer_id, start_ts - start_ts % 86400 AS day, SUM(duration)
+                FROM session_intervals
+                WHERE computer_id = ? AND start_ts >= ? AND {_VALID_INTERVAL}
+                GROUP BY day
+            """, (computer_id, first_day))
+            for table, column, key_format in (('usage_weekly', 'week', '%Y-%W'), ('usage_monthly', 'month', '%Y-%m')):
+                self.cursor.execute(
+                    f"DELETE FROM {table} WHERE computer_id = ? AND {column} >= strftime('{key_format}', ?, 'unixepoch')",
+                    (computer_id, first_day)
+                )
+                self.cursor.execute(f"""
+                    INSERT INTO {table} (computer_id, {column}, seconds)
+                    SELECT computer_id, strftime('{key_format}', day, 'unixepoch') AS period, SUM(seconds)
+                    FROM usage_daily
+                    WHERE computer_id = ? AND period >= strftime('{key_format}', ?, 'unixepoch')
+                    GROUP BY period
+                """, (computer_id, first_day))
+            self.cursor.execute("SELECT room FROM computers WHERE id = ?", (computer_id,))
+            room = self.cursor.fetchone()[0]
+            if room is not None:
+                rooms[room] = min(first_day, rooms.get(room, first_day))
+
+        for room, first_day in rooms.items():
             self.cursor.execute(
-                "INSERT INTO sessions (event, timestamp, computer, user) VALUES (?, ?, ?, ?)",
-                (event, timestamp, computer, user)
+                "DELETE FROM usage_room_monthly WHERE room = ? AND month >= strftime('%Y-%m', ?, 'unixepoch')",
+                (room, first_day)
             )
-        except sqlite3.IntegrityError:
-            # Ignorer les doublons en cas de violation de contrainte UNIQUE
-            pass
+            self.cursor.execute("""
+                INSERT INTO usage_room_monthly (room, month, seconds)
+                SELECT c.room, m.month, SUM(m.seconds)
+                FROM usage_monthly m
+                JOIN computers c ON c.id = m.computer_id
+                WHERE c.room = ? AND m.month >= strftime('%Y-%m', ?, 'unixepoch')
+                GROUP BY m.month
+            """, (room, first_day))
+
+    def get_imported_file(self, filename: str):
+        # Retourne l'état d'import d'un fichier (taille, mtime, offset, hash du préfixe importé et de ses derniers
+        # octets) ou None.
+        self.cursor.execute(
+            "SELECT size, mtime_ns, offset, prefix_hash, tail_hash FROM imported_files WHERE filename = ?",
+            (filename,)
+        )
+        row = self.cursor.fetchone()
+        if row is None:
+            return None
+        size, mtime_ns, offset, prefix_hash, tail_hash = row
+        return {'size': size, 'mtime_ns': mtime_ns, 'offset': offset, 'prefix_hash': prefix_hash,
+                'tail_hash': tail_hash}
+
+    def fetch_imported_prefixes(self, max_offset: int) -> dict:
+        # Retourne les empreintes des préfixes déjà importés qui tiennent dans max_offset octets : {offset: {hash, ...}}.
+        self.cursor.execute(
+            "SELECT offset, prefix_hash FROM imported_files WHERE offset > 0 AND offset <= ? AND prefix_hash IS NOT NULL",
+            (max_offset,)
+        )
+        prefixes = {}
+        for offset, prefix_hash in self.cursor.fetchall():
+            prefixes.setdefault(offset, set()).add(prefix_hash)
+        return prefixes
+
+    def is_content_imported(self, size: int, content_hash: str) -> bool:
+        # Vérifie si un fichier de même taille et de même contenu (hash du fichier entier) a déjà été importé.
+        self.cursor.execute(
+            "SELECT 1 FROM imported_files WHERE size = ? AND content_hash = ? LIMIT 1", (size, content_hash)
+        )
+        return self.cursor.fetchone() is not None
+
+    def mark_file_imported(self, filename: str, size: int = None, mtime_ns: int = None,
+                           offset: int = None, prefix_hash: str = None, content_hash: str = None,
+                           tail_hash: str = None):
+        # Marque un fichier comme importé (ou met à jour son état) dans la base de données.
+        # offset est la position après la dernière ligne complète importée, prefix_hash le hash des octets [0, offset),
+        # content_hash celui du fichier entier [0, size) et tail_hash celui des derniers octets avant offset.
+        self._begin_write()
+        self.cursor.execute(
+            "INSERT OR REPLACE INTO imported_files "
+            "(filename, size, mtime_ns, offset, prefix_hash, content_hash, tail_hash) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (filename, size, mtime_ns, offset, prefix_hash, content_hash, tail_hash)
+        )
+
+    def _to_epoch(self, timestamp: str) -> int:
+        # Convertit "yyyy-mm-dd hh:mm:ss" en secondes epoch (le jour est mis en cache).
+        day = timestamp[:10]
+        day_epoch = self._day_epochs.get(day)
+        if day_epoch is None:
+            day_epoch = (date.fromisoformat(day).toordinal() - _EPOCH_ORDINAL) * 86400
+            self._day_epochs[day] = day_epoch
+        return day_epoch + int(timestamp[11:13]) * 3600 + int(timestamp[14:16]) * 60 + int(timestamp[17:19])
+
+    def _dimension_id(self, table: str, cache: dict, name: str) -> int:
+        # Retourne l'id d'un poste ou d'un utilisateur, en le créant s'il est nouveau
+        # (un nouveau poste est enregistré avec sa salle).
+        dimension_id = cache.get(name)
+        if dimension_id is None:
+            if table == 'computers':
+                self.cursor.execute("INSERT OR IGNORE INTO computers (name, room) VALUES (?, ?)",
+                                    (name, room_for_computer(name)))
+            else:
+                self.cursor.execute(f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", (name,))
+            self.cursor.execute(f"SELECT id FROM {table} WHERE name = ?", (name,))
+            dimension_id = self.cursor.fetchone()[0]
+            cache[name] = dimension_id
+        return dimension_id
+
+    def _encode_session(self, event: str, timestamp: str, computer: str, user: str):
+        # Convertit une session texte en ligne (event_id, ts, computer_id, user_id) du schéma compact.
+        return (
+            EVENT_IDS[event],
+            self._to_epoch(timestamp),
+            self._dimension_id('computers', self._computer_ids, computer),
+            self._dimension_id('users', self._user_ids, user),
+        )
+
+    def insert_sessions(self, rows, chunk_size: int = 5000):
+        # Insère en masse des sessions (event, timestamp, computer, user) par paquets avec executemany.
+        # Les doublons sont ignorés par SQLite (INSERT OR IGNORE) au lieu de lever une IntegrityError.
+        # Tout est écrit dans une seule transaction explicite, validée par l'appelant via commit(),
+        # y compris la mise à jour des intervalles de session touchés.
+        # Retourne le couple (nombre de sessions insérées, nombre de doublons ignorés).
+        self._begin_write()
+        last_id = self.fetch_max_session_id()
+        inserted = 0
+        duplicates = 0
+        rows = iter(rows)
+        while True:
+            chunk = [self._encode_session(*row) for row in islice(rows, chunk_size)]
+            if not chunk:
+                break
+            changes_before = self.conn.total_changes
+            self.cursor.executemany(
+                "INSERT OR IGNORE INTO session_events (event_id, ts, computer_id, user_id) VALUES (?, ?, ?, ?)",
+                chunk
+            )
+            chunk_inserted = self.conn.total_changes - changes_before
+            inserted += chunk_inserted
+            duplicates += len(chunk) - chunk_inserted
+        if inserted and not self.connections.bulk_loading:
+            # En chargement en masse, les intervalles sont recalculés une seule fois par end_bulk_load()
+            self._update_intervals_after(last_id)
+        return inserted, duplicates
 
     def fetch_sessions(self):
-        # Récupère toutes les sessions de la base de données.
-        self.cursor.execute("SELECT * FROM sessions")
+        # Récupère toutes les sessions de la base de données, par id (la vue sessions n'a pas d'ordre garanti :
+        # après ANALYZE, le planificateur peut la lire par l'index des noms de postes).
+        self.cursor.execute("SELECT * FROM sessions ORDER BY id")
         return self.cursor.fetchall()
     
+    def fetch_max_session_id(self) -> int:
+        # Retourne le plus grand id de session (0 si la table est vide).
+        self.cursor.execute("SELECT COALESCE(MAX(id), 0) FROM session_events")
+        return self.cursor.fetchone()[0]
+
+    def fetch_new_sessions_per_computer(self, last_id: int) -> dict:
+        # Nombre de sessions insérées après l'id donné, par poste (import incrémental) : les vues n'ont besoin
+        # que des postes touchés, pas des lignes elles-mêmes (lues au besoin par la pagination du tableau).
+        self.cursor.execute("""
+            SELECT c.name, COUNT(*)
+            FROM session_events s
+            JOIN computers c ON c.id = s.computer_id
+            WHERE s.id > ?
+            GROUP BY c.name
+        """, (last_id,))
+        return dict(self.cursor.fetchall())
+
+    @staticmethod
+    def _top_clause(value_column: str, name_column: str, limit, descending: bool, offset: int = 0):
+        # Clause "ORDER BY valeur, nom LIMIT ? OFFSET ?" des requêtes top-N (les ex aequo restent triés par nom)
+        # et ses paramètres (-1 : pas de limite ; offset saute les premiers rangs, pour lire une page suivante).
+        direction = 'DESC' if descending else 'ASC'
+        return (f"ORDER BY {value_column} {direction}, {name_column} LIMIT ? OFFSET ?",
+                (-1 if limit is None else limit, offset))
+
+    def _rank_overview(self, values_query: str, buckets: int, descending: bool) -> list:
+        # Vue d'ensemble d'un classement (name, value) : les rangs sont répartis en buckets tranches consécutives
+        # (NTILE), résumées chacune par (nombre, minimum, maximum, total). Taille bornée quel que soit le parc.
+        direction = 'DESC' if descending else 'ASC'
+        self.cursor.execute(f"""
+            SELECT COUNT(*), MIN(value), MAX(value), SUM(value)
+            FROM (SELECT value, NTILE(?) OVER (ORDER BY value {direction}, name) AS bucket FROM ({values_query}))
+            GROUP BY bucket
+            ORDER BY bucket
+        """, (buckets,))
+        return self.cursor.fetchall()
+
+    @staticmethod
+    def top_items(data: dict, limit, descending: bool = True) -> dict:
+        # Sélection partielle par tas des limit meilleures valeurs d'un résultat calculé en Python,
+        # dans le même ordre qu'un tri complet (stable) puis découpage.
+        if limit is None:
+            return dict(sorted(data.items(), key=lambda item: item[1], reverse=descending))
+        select = heapq.nlargest if descending else heapq.nsmallest
+        return dict(select(limit, data.items(), key=lambda item: item[1]))
+
+    @cached_query
     def fetch_all_computers(self):
-        # Fetch all distinct computers from the sessions table
-        self.cursor.execute("SELECT DISTINCT computer FROM sessions")
+        # Fetch all computers from the computers dimension table
+        self.cursor.execute("SELECT name FROM computers ORDER BY id")
         return [row[0] for row in self.cursor.fetchall()]
 
 
-    def search_sessions(self, query):
-        # Recherche les sessions contenant le terme de recherche.
+    def _search_condition(self, field: str, value: str):
+        # Condition SQL (et paramètres) d'un terme de recherche sur un champ : 'computer', 'user', 'event',
+        # 'date' ou None (texte libre : l'un des quatre champs contient le terme).
+        pattern = f'%{value}%'
+        conditions = []
+        if field in ('computer', None):
+            conditions.append((f"s.computer_id IN (SELECT rowid FROM {self.search_tables['computers']} WHERE name LIKE ?)", (pattern,)))
+        if field in ('user', None):
+            conditions.append((f"s.user_id IN (SELECT rowid FROM {self.search_tables['users']} WHERE name LIKE ?)", (pattern,)))
+        if field in ('event', None):
+            self.cursor.execute("SELECT id FROM event_types WHERE name LIKE ?", (pattern,))
+            event_ids = [row[0] for row in self.cursor.fetchall()]
+            if event_ids:
+                conditions.append((f"s.event_id IN ({', '.join('?' for _ in event_ids)})", tuple(event_ids)))
+        if field in ('date', None) and set(value) <= _TIMESTAMP_CHARS:
+            # Un préfixe de date devient une plage sur l'index de ts ; tout autre fragment est comparé au texte
+            ts_range = _timestamp_range(value)
+            if ts_range is not None:
+                conditions.append(("(s.ts >= ? AND s.ts < ?)", ts_range))
+            else:
+                conditions.append(("datetime(s.ts, 'unixepoch') LIKE ?", (pattern,)))
+        if not conditions:
+            return "0", ()
+        return "(" + " OR ".join(sql for sql, _ in conditions) + ")", tuple(param for _, params in conditions for param in params)
+
+    def search_sessions(self, query, limit: int = None, after_id: int = 0):
+        # Recherche les sessions correspondant à query : texte libre (contenu dans l'événement, la date, le poste
+        # ou l'utilisateur) et filtres "computer:", "user:", "event:" ou "date:", tous combinés par ET.
+        # Résultats triés par id et paginés par clé : la page suivante commence après le dernier id reçu.
+        return self.fetch_sessions_page('id', (after_id,), limit, query)
+
+    @staticmethod
+    def session_sort_key(order: str, row) -> tuple:
+        # Clé de pagination d'une ligne (id, event, timestamp, computer, user) pour l'ordre donné.
+        if order == 'id':
+            return (row[0],)
+        return row[_SESSION_ORDER_FIELDS[order]], row[0]
+
+    def fetch_sessions_page(self, order: str = 'id', after: tuple = None, limit: int = None, query: str = None):
+        # Page de sessions triées selon SESSION_ORDERS[order] puis par id, commençant après la clé after
+        # (session_sort_key de la dernière ligne de la page précédente), éventuellement filtrées par une recherche.
+        # La pagination par clé parcourt l'index de tri à partir de la dernière ligne vue, sans OFFSET.
+        if order not in SESSION_ORDERS:
+            raise ValueError(f"Invalid order: {order}")
+        order_column = SESSION_ORDERS[order]
+        conditions, params = [], []
+        if after is not None:
+            if order_column is None:
+                conditions.append("s.id > ?")
+                params.append(after[0])
+            else:
+                value, last_id = after
+                if order == 'date':
+                    value = self._to_epoch(value)
+                # La borne "colonne >= ?" reste utilisable par l'index ; l'id départage la valeur de la dernière ligne
+                conditions.append(f"{order_column} >= ? AND ({order_column} > ? OR s.id > ?)")
+                params.extend((value, value, last_id))
+        if query:
+            free_text, filters = parse_search_query(query)
+            if free_text:
+                filters.append((None, free_text))
+            for field, value in filters:
+                condition, condition_params = self._search_condition(field, value)
+                conditions.append(condition)
+                params.extend(condition_params)
+        order_by = "s.id" if order_column is None else f"{order_column}, s.id"
+        params.append(-1 if limit is None else limit)
+        # CROSS JOIN fixe l'ordre des boucles de SQLite : la table de noms d'abord, puis ses sessions par l'index
+        driver = _SESSION_ORDER_DRIVERS.get(order)
+        if driver is None:
+            from_clause = "session_events s"
+        else:
+            from_clause = f"{driver} CROSS JOIN session_events s ON {_SESSION_JOINS[driver]}"
+        joins = " ".join(f"JOIN {table} ON {on}" for table, on in _SESSION_JOINS.items() if table != driver)
         cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT * FROM sessions
-            WHERE event LIKE ? OR timestamp LIKE ? OR computer LIKE ? OR user LIKE ?
-        """, (f'%{query}%', f'%{query}%', f'%{query}%', f'%{query}%'))
+        cursor.execute(f"""
+            SELECT s.id, e.name, datetime(s.ts, 'unixepoch'), c.name, u.name
+            FROM {from_clause}
+            JOIN event_types e ON e.id = s.event_id
+            {joins}
+            {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+            ORDER BY {order_by}
+            LIMIT ?
+        """, params)
         return cursor.fetchall()
 
 
     def fetch_computer_usage(self):
         # Récupère le pourcentage d'utilisation de chaque ordinateur.
-        self.cursor.execute("""
-            SELECT computer, SUM(session_duration) AS total_usage
-            FROM (
-                SELECT
-                s1.computer,
-                (
-                    (julianday(
-                        (SELECT MIN(s2.timestamp) 
-                         FROM sessions s2 
-                         WHERE s2.computer = s1.computer 
-                         AND s2.user = s1.user 
-                         AND s2.event = 'LOGOFF' 
-                         AND s2.timestamp > s1.timestamp)
-                    ) - julianday(s1.timestamp)) * 86400
-                ) AS session_duration,
-                (
-                    (julianday(
-                        (SELECT MIN(s2.timestamp) 
-                         FROM sessions s2 
-                         WHERE s2.computer = s1.computer 
-                         AND s2.user = s1.user 
-                         AND s2.event = 'LOGOFF' 
-                         AND s2.timestamp > s1.timestamp)
-                    ) - julianday(s1.timestamp)) * 86400
-                ) AS raw_duration_seconds
-                FROM sessions s1
-                WHERE s1.event = 'LOGON'
-                AND (SELECT MIN(s2.timestamp) 
-                     FROM sessions s2 
-                     WHERE s2.computer = s1.computer 
-                     AND s2.user = s1.user 
-                     AND s2.event = 'LOGOFF' 
-                     AND s2.timestamp > s1.timestamp) IS NOT NULL
-            ) AS sessions_durations
-            WHERE raw_duration_seconds <= 86400 
-            GROUP BY computer
-        """)
+        return self.usage_percentages(self.fetch_computer_usage_seconds())
+
+    @staticmethod
+    def usage_percentages(usage_data: dict, total_usage_all=None) -> dict:
+        # Convertit des durées d'utilisation par poste en pourcentages du total
+        # (total de tous les postes à fournir quand usage_data n'en contient qu'une partie).
+        if total_usage_all is None:
+            total_usage_all = sum(usage_data.values())
+        return {computer: round((usage / total_usage_all) * 100, 2) for computer, usage in usage_data.items()}
+
+    @cached_query
+    def fetch_computer_usage_seconds(self, limit=None, descending: bool = True, offset: int = 0) -> dict:
+        # Récupère le temps d'utilisation (en secondes) de chaque ordinateur,
+        # trié par temps (décroissant par défaut) et réduit aux limit premiers (après offset) par la requête.
+        top_clause, top_params = self._top_clause('total_usage', 'c.name', limit, descending, offset)
+        self.cursor.execute(f"""
+            SELECT c.name, SUM(m.seconds) AS total_usage
+            FROM usage_monthly m
+            JOIN computers c ON c.id = m.computer_id
+            GROUP BY c.name
+            {top_clause}
+        """, top_params)
         results = self.cursor.fetchall()
-        usage_data = {computer: total_usage if total_usage is not None else 0.0 for computer, total_usage in results}
-        total_usage_all = sum(usage_data.values())
-        usage_percentage = {computer: round((usage / total_usage_all) * 100, 2) for computer, usage in usage_data.items()}
-        return usage_percentage
+        return {computer: total_usage if total_usage is not None else 0.0 for computer, total_usage in results}
+
+    @cached_query
+    def fetch_total_usage_seconds(self) -> int:
+        # Temps d'utilisation total de tous les postes (base des pourcentages d'un graphique limité)
+        self.cursor.execute("SELECT COALESCE(SUM(seconds), 0) FROM usage_monthly")
+        return self.cursor.fetchone()[0]
     
-    def fetch_users_per_computer(self) -> dict:
-        #Récupère le nombre d'utilisateurs distincts par ordinateur
-        self.cursor.execute("""
-            SELECT computer, COUNT(DISTINCT user) 
-            FROM sessions 
-            WHERE event = 'LOGON' 
-            GROUP BY computer
-        """)
+    @cached_query
+    def fetch_users_per_computer(self, limit=None, descending: bool = True, offset: int = 0) -> dict:
+        #Récupère le nombre d'utilisateurs distincts par ordinateur,
+        # trié par nombre d'utilisateurs et réduit aux limit premiers (après offset) par la requête
+        top_clause, top_params = self._top_clause('user_count', 'c.name', limit, descending, offset)
+        self.cursor.execute(f"""
+            SELECT c.name, COUNT(DISTINCT s.user_id) AS user_count
+            FROM session_events s
+            JOIN computers c ON c.id = s.computer_id
+            WHERE s.event_id = {LOGON_ID} 
+            GROUP BY c.name
+            {top_clause}
+        """, top_params)
         results = self.cursor.fetchall()
         return {computer: count for computer, count in results}
     
+    @cached_query
+    def fetch_computer_usage_overview(self, buckets: int, descending: bool = True) -> list:
+        # Vue d'ensemble du classement des postes par temps d'utilisation (voir _rank_overview)
+        return self._rank_overview("""
+            SELECT c.name AS name, SUM(m.seconds) AS value
+            FROM usage_monthly m
+            JOIN computers c ON c.id = m.computer_id
+            GROUP BY c.name
+        """, buckets, descending)
+
+    @cached_query
+    def fetch_users_per_computer_overview(self, buckets: int, descending: bool = True) -> list:
+        # Vue d'ensemble du classement des postes par nombre d'utilisateurs distincts (voir _rank_overview)
+        return self._rank_overview(f"""
+            SELECT c.name AS name, COUNT(DISTINCT s.user_id) AS value
+            FROM session_events s
+            JOIN computers c ON c.id = s.computer_id
+            WHERE s.event_id = {LOGON_ID}
+            GROUP BY c.name
+        """, buckets, descending)
+
+    @cached_query
     def fetch_time_by_computer_day_week_month(self) -> dict:
-        # Requête qui couple chaque LOGON à son premier LOGOFF ultérieur et réfuse les séssions ou la durée est supérieure à 24 heures
-        self.cursor.execute("""
-            SELECT
-                l.computer,
-                strftime('%Y-%m-%d', l.timestamp) AS day,
-                strftime('%Y-%W', l.timestamp) AS week,
-                strftime('%Y-%m', l.timestamp) AS month,
-                (julianday(
-                    (SELECT MIN(timestamp)
-                    FROM sessions
-                    WHERE computer = l.computer
-                    AND user = l.user
-                    AND event = 'LOGOFF'
-                    AND timestamp > l.timestamp)
-                ) - julianday(l.timestamp)) * 86400 AS session_time_seconds
-            FROM sessions l
-            WHERE l.event = 'LOGON'
-            AND (SELECT MIN(timestamp)
-                FROM sessions
-                WHERE computer = l.computer
-                AND user = l.user
-                AND event = 'LOGOFF'
-                AND timestamp > l.timestamp) IS NOT NULL
-            AND (julianday(
-                (SELECT MIN(timestamp)
-                FROM sessions
-                WHERE computer = l.computer
-                AND user = l.user
-                AND event = 'LOGOFF'
-                AND timestamp > l.timestamp)
-            ) - julianday(l.timestamp)) * 86400 <= 86400
-        """)
-        results = self.cursor.fetchall()
-        
+        # Temps d'utilisation par poste et par jour/semaine/mois, lu dans les tables d'agrégats
+        # (les sessions de plus de 24 heures ou sans LOGOFF sont exclues)
         time_data = {}
-        for computer, day, week, month, session_time_seconds in results:
-            if computer not in time_data:
-                time_data[computer] = {'Jour': {}, 'Semaine': {}, 'Mois': {}}
-            
-            # Ajouter le temps pour le jour
-            time_data[computer]['Jour'][day] = time_data[computer]['Jour'].get(day, 0) + session_time_seconds
-            # Pour la semaine
-            time_data[computer]['Semaine'][week] = time_data[computer]['Semaine'].get(week, 0) + session_time_seconds
-            # Pour le mois
-            time_data[computer]['Mois'][month] = time_data[computer]['Mois'].get(month, 0) + session_time_seconds
+        for period, query in (
+            ('Jour', "SELECT c.name, date(u.day, 'unixepoch'), u.seconds FROM usage_daily u"),
+            ('Semaine', "SELECT c.name, u.week, u.seconds FROM usage_weekly u"),
+            ('Mois', "SELECT c.name, u.month, u.seconds FROM usage_monthly u"),
+        ):
+            self.cursor.execute(query + " JOIN computers c ON c.id = u.computer_id ORDER BY u.computer_id, 2")
+            for computer, key, session_time_seconds in self.cursor.fetchall():
+                if computer not in time_data:
+                    time_data[computer] = {'Jour': {}, 'Semaine': {}, 'Mois': {}}
+                time_data[computer][period][key] = session_time_seconds
         
         return time_data
     
 
-    def group_computers_by_room(self):
-        # Récupère tous les noms d'ordinateurs
-        all_computers = self.fetch_all_computers()
-        
-        # Dictionnaire pour stocker les groupes d'ordinateurs par salle
-        rooms = {}
+    @cached_query
+    def fetch_time_by_period(self, computer: str, period: str, start_date: str = None, end_date: str = None) -> dict:
+        # Temps d'utilisation (en secondes) d'un seul poste (nom sans tenir compte de la casse) pour la période
+        # 'Jour', 'Semaine' ou 'Mois', éventuellement bornée par des dates "yyyy-mm-dd" incluses.
+        # Parcours par plage de la clé primaire (poste, période) de la table d'agrégats : {poste: {clé: secondes}}.
+        if period not in _PERIOD_ROLLUPS:
+            raise ValueError(f"Invalid period: {period}")
+        table, column, key, bound = _PERIOD_ROLLUPS[period]
+        conditions, bounds = [], []
+        if start_date is not None:
+            conditions.append(f"AND {column} >= {bound}")
+            bounds.append(start_date)
+        if end_date is not None:
+            conditions.append(f"AND {column} <= {bound}")
+            bounds.append(end_date)
 
-        for computer in all_computers:
-            # Normalise le nom en supprimant uniquement les suffixes purement numériques
-            normalized = re.sub(r'(-W\d{2,}|\b\d+\b)$', '', computer, flags=re.IGNORECASE)
-            
-            normalized = normalized.rstrip("-")  # Supprime le tiret à la fin si présent
-            # Pour les ordinateurs dont le nom normalisé est non vide, on les regroupe
-            if normalized:
-                if normalized not in rooms:
-                    rooms[normalized] = []
-                rooms[normalized].append(computer)
+        # Recherche par idx_computers_name_nocase (même collation que la comparaison)
+        self.cursor.execute("SELECT id, name FROM computers WHERE name = ? COLLATE NOCASE", (computer,))
+        time_data = {}
+        for computer_id, name in self.cursor.fetchall():
+            self.cursor.execute(f"""
+                SELECT {key}, seconds FROM {table}
+                WHERE computer_id = ? {' '.join(conditions)}
+                ORDER BY {column}
+            """, (computer_id, *bounds))
+            usage = dict(self.cursor.fetchall())
+            if usage:
+                time_data[name] = usage
+        return time_data
 
+    @cached_query
+    def group_computers_by_room(self):
+        # Regroupe les postes par salle à partir de la salle enregistrée pour chaque poste
+        self.cursor.execute("SELECT room, name FROM computers WHERE room IS NOT NULL ORDER BY id")
+        rooms = {}
+        for room, computer in self.cursor.fetchall():
+            rooms.setdefault(room, []).append(computer)
         return rooms  # Retourne tous les groupes, y compris ceux avec un seul ordinateur
 
+    @cached_query
+    def fetch_all_rooms(self):
+        # Liste des salles connues
+        self.cursor.execute("SELECT DISTINCT room FROM computers WHERE room IS NOT NULL ORDER BY room")
+        return [row[0] for row in self.cursor.fetchall()]
 
-    def fetch_users_per_rooms_stats(self):
-        # Récupère les groupes d'ordinateurs par salle
-        rooms = self.group_computers_by_room()
-        
-        # Dictionnaire pour stocker le nombre d'utilisateurs par salle
-        users_per_room = {}
-
-        for room, computers in rooms.items():
-            # Récupère les utilisateurs distincts pour les ordinateurs de cette salle
-            placeholders = ', '.join('?' for _ in computers)
-            query = f"""
-                SELECT COUNT(DISTINCT user)
-                FROM sessions
-                WHERE computer IN ({placeholders})
-            """
-            self.cursor.execute(query, computers)
-            count = self.cursor.fetchone()[0]
-            users_per_room[room] = users_per_room.get(room, 0) + count  # Additionne les utilisateurs pour la salle
-        
-        return users_per_room
+    @cached_query
+    def fetch_users_per_rooms_stats(self, limit=None, descending: bool = True):
+        # Nombre d'utilisateurs distincts par salle, en une seule requête groupée par salle
+        # (triée par nombre d'utilisateurs et réduite aux limit premières salles)
+        top_clause, top_params = self._top_clause('user_count', 'c.room', limit, descending)
+        self.cursor.execute(f"""
+            SELECT c.room, COUNT(DISTINCT s.user_id) AS user_count
+            FROM session_events s
+            JOIN computers c ON c.id = s.computer_id
+            WHERE c.room IS NOT NULL
+            GROUP BY c.room
+            {top_clause}
+        """, top_params)
+        return {room: count for room, count in self.cursor.fetchall()}
 
-    def fetch_time_per_rooms_stats(self):
-        # Récupère les groupes d'ordinateurs par salle
-        rooms = self.group_computers_by_room()
-        
-        # Dictionnaire pour stocker le temps d'utilisation par salle
-        time_per_room = {}
-
-        for room, computers in rooms.items():
-            # Récupère le temps d'utilisation total pour les ordinateurs de cette salle
-            placeholders = ', '.join('?' for _ in computers)
-            query = f"""
-                SELECT SUM(session_time_seconds)
-                FROM (
-                    SELECT 
-                    l.computer,
-                    (julianday(
-                        (SELECT MIN(timestamp)
-                        FROM sessions
-                        WHERE computer = l.computer
-                        AND user = l.user
-                        AND event = 'LOGOFF'
-                        AND timestamp > l.timestamp)
-                    ) - julianday(l.timestamp)) * 86400 AS session_time_seconds
-                    FROM sessions l
-                    WHERE l.event = 'LOGON'
-                    AND (SELECT MIN(timestamp)
-                        FROM sessions
-                        WHERE computer = l.computer
-                        AND user = l.user
-                        AND event = 'LOGOFF'
-                        AND timestamp > l.timestamp) IS NOT NULL
-                    AND (julianday(
-                        (SELECT MIN(timestamp)
-                        FROM sessions
-                        WHERE computer = l.computer
-                        AND user = l.user
-                        AND event = 'LOGOFF'
-                        AND timestamp > l.timestamp)
-                    ) - julianday(l.timestamp)) * 86400 <= 86400
-                ) AS session_times
-                WHERE computer IN ({placeholders})
-            """
-            self.cursor.execute(query, computers)
-            total_time_seconds = self.cursor.fetchone()[0]
-            time_per_room[room] = time_per_room.get(room, 0) + (total_time_seconds / 3600 if total_time_seconds else 0)  # Additionne le temps pour la salle
-        
-        return time_per_room
+    @cached_query
+    def fetch_time_per_rooms_stats(self, limit=None, descending: bool = True):
+        # Temps d'utilisation total par salle (en heures), à partir des agrégats mensuels des salles
+        # (trié par temps et réduit aux limit premières salles)
+        top_clause, top_params = self._top_clause('total_seconds', 'r.room', limit, descending)
+        self.cursor.execute(f"""
+            SELECT r.room, COALESCE(SUM(m.seconds), 0) AS total_seconds
+            FROM (SELECT DISTINCT room FROM computers WHERE room IS NOT NULL) r
+            LEFT JOIN usage_room_monthly m ON m.room = r.room
+            GROUP BY r.room
+            {top_clause}
+        """, top_params)
+        return {room: (total_time_seconds / 3600 if total_time_seconds else 0)
+                for room, total_time_seconds in self.cursor.fetchall()}
 
-    def fetch_monthly_usage_per_room(self):
-        # Récupère les groupes d'ordinateurs par salle
-        rooms = self.group_computers_by_room()
-        
-        # Dictionnaire pour stocker le temps d'utilisation par mois pour chaque salle
-        monthly_usage_per_room = {}
-
-        for room, computers in rooms.items():
-            # Récupère le temps d'utilisation total par mois pour les ordinateurs de cette salle
-            placeholders = ', '.join('?' for _ in computers)
-            query = f"""
-                SELECT 
-                    strftime('%Y-%m', l.timestamp) AS month,
-                    SUM((julianday(
-                        (SELECT MIN(timestamp)
-                        FROM sessions
-                        WHERE computer = l.computer
-                        AND user = l.user
-                        AND event = 'LOGOFF'
-                        AND timestamp > l.timestamp)
-                    ) - julianday(l.timestamp)) * 86400) / 3600 AS total_hours
-                FROM sessions l
-                WHERE l.event = 'LOGON'
-                AND (SELECT MIN(timestamp)
-                    FROM sessions
-                    WHERE computer = l.computer
-                    AND user = l.user
-                    AND event = 'LOGOFF'
-                    AND timestamp > l.timestamp) IS NOT NULL
-                AND (julianday(
-                    (SELECT MIN(timestamp)
-                    FROM sessions
-                    WHERE computer = l.computer
-                    AND user = l.user
-                    AND event = 'LOGOFF'
-                    AND timestamp > l.timestamp)
-                ) - julianday(l.timestamp)) * 86400 <= 86400
-                AND l.computer IN ({placeholders})
-                GROUP BY month
-                ORDER BY month
-            """
-            self.cursor.execute(query, computers)
-            results = self.cursor.fetchall()
-            if room not in monthly_usage_per_room:
-                monthly_usage_per_room[room] = {}
-            for row in results:
-                month, total_hours = row
-                monthly_usage_per_room[room][month] = monthly_usage_per_room[room].get(month, 0) + total_hours  # Additionne les heures pour chaque mois
-        
+    @cached_query
+    def fetch_monthly_usage_per_room(self, room: str = None):
+        # Temps d'utilisation par mois pour chaque salle (ou pour la seule salle donnée), en heures,
+        # lu dans usage_room_monthly
+        monthly_usage_per_room = {name: {} for name in self.fetch_all_rooms() if room is None or name == room}
+        room_filter, params = ('', ()) if room is None else ('WHERE room = ?', (room,))
+        self.cursor.execute(f"""
+            SELECT room, month, seconds / 3600.0
+            FROM usage_room_monthly
+            {room_filter}
+            ORDER BY room, month
+        """, params)
+        for name, month, total_hours in self.cursor.fetchall():
+            monthly_usage_per_room[name][month] = total_hours
         return monthly_usage_per_room
     
-    def clear_database(self):
-        # Supprime toutes les données des tables sessions et imported_files
-        self.cursor.execute("DELETE FROM sessions")
+    def clear_database(self, timeout: float = -1):
+        # Supprime toutes les données des sessions, des dimensions et de imported_files
+        # (sqlite3.OperationalError si la base reste occupée par une autre écriture au-delà de timeout secondes)
+        self._begin_write(timeout)
+        self.cursor.execute("DELETE FROM session_events")
+        self.cursor.execute("DELETE FROM session_intervals")
+        for table in ('usage_daily', 'usage_weekly', 'usage_monthly', 'usage_room_monthly'):
+            self.cursor.execute(f"DELETE FROM {table}")
+        self.cursor.execute("DELETE FROM computers")
+        self.cursor.execute("DELETE FROM users")
         self.cursor.execute("DELETE FROM imported_files")
         self.conn.commit()
+        self.connections.end_write()
+        self._committed_changes = self.conn.total_changes
+        self.connections.bump_generation()
+        self._clear_caches()
     
 
+    def set_cancel_check(self, should_stop, steps: int = 1000):
+        # Interrompt la requête en cours (sqlite3.OperationalError "interrupted") dès que should_stop() est vrai ;
+        # testé toutes les steps instructions de la machine virtuelle SQLite. None retire le contrôle.
+        if should_stop is None:
+            self.conn.set_progress_handler(None, 0)
+        else:
+            self.conn.set_progress_handler(lambda: 1 if should_stop() else 0, steps)
+
     def set_limit(self, limit):
         # Définit la limite d'affiche de  résultats pour les requêtes.
         self.limit = limit
 
-    def fetch_limited_data(self, data):
-        ## Limite le nombre de résultats affichés.
-        if self.limit is not None:
-            return dict(list(data.items())[:self.limit])
-        return data
-
-
-    
     def commit(self):
-        # Effectue un commit sur la connexion.
+        # Effectue un commit sur la connexion ; si des données ont changé, les résultats en cache deviennent périmés.
         self.conn.commit()
+        self.connections.end_write()
+        if self.conn.total_changes != self._committed_changes:
+            self._committed_changes = self.conn.total_changes
+            generation = self.connections.bump_generation()
+            if self._ids_version is not None:
+                self._ids_version = (self._ids_version[0], generation)  # Ses propres écritures gardent les ids valides
+
+    def rollback(self):
+        # Annule la transaction en cours (import interrompu ou en erreur).
+        self.conn.rollback()
+        self.connections.end_write()
+        self._clear_caches()  # Les ids créés dans la transaction annulée n'existent plus
+
+    def _begin_write(self, timeout: float = -1):
+        # Prend le verrou d'écriture de la base et ouvre la transaction (BEGIN IMMEDIATE) si elle ne l'est pas déjà ;
+        # toute écriture passe par là, et le verrou est rendu par commit() ou rollback().
+        # timeout : attente maximale du verrou en secondes (voir ConnectionManager.begin_write), illimitée par défaut.
+        self.connections.begin_write(timeout)
+        if not self.conn.in_transaction:
+            if timeout >= 0:  # Même délai pour un écrivain d'un autre processus (busy_timeout de SQLite)
+                self.cursor.execute(f"PRAGMA busy_timeout = {int(timeout * 1000)}")
+            try:
+                self.cursor.execute("BEGIN IMMEDIATE")  # Base occupée par un autre processus : "database is locked"
+            except sqlite3.Error:
+                self.connections.end_write()
+                raise
+            finally:
+                if timeout >= 0:
+                    self.cursor.execute(f"PRAGMA busy_timeout = {self.connections.BUSY_TIMEOUT_MS}")
+            self._check_id_caches()
+
+    def _check_id_caches(self):
+        # Vide les caches nom -> id si la base a été modifiée ailleurs depuis la dernière écriture de ce DBManager
+        # (clear_database d'une autre fenêtre ou d'un autre processus vide les dimensions) : PRAGMA data_version
+        # change à chaque commit d'une autre connexion, la génération à chaque commit d'un autre DBManager du processus.
+        # Vérifié sous BEGIN IMMEDIATE, personne ne peut plus écrire avant le commit.
+        version = (self.conn.execute("PRAGMA data_version").fetchone()[0], self.connections.generation)
+        if version != self._ids_version:
+            self._clear_caches()
+            self._ids_version = version
+
+    def _cached_result(self, key, compute):
+        # Retourne le résultat du cache partagé de la base pour key, ou le calcule avec compute().
+        # Pendant une transaction d'écriture, les données ne sont pas validées : le cache n'est pas utilisé.
+        if self.conn.in_transaction:
+            return compute()
+        return self.connections.cached_result(key, compute)
+
+    def _clear_caches(self):
+        # Vide les caches d'ids des dimensions.
+        self._computer_ids.clear()
+        self._user_ids.clear()
 
     def close(self):
-        # Ferme la connexion à la base de données.
+        # Libère la connexion partagée (fermée quand plus aucun DBManager du thread ne l'utilise).
         if self.conn:
-            self.conn.close()
\ No newline at end of file
+            if self.conn.in_transaction:
+                self.rollback()  # Comme sqlite3 à la fermeture : une transaction non validée est annulée
+            self.conn = None
+            self.connections.release()
\ No newline at end of file
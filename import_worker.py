@@ -0,0 +1,165 @@
+# import_worker.py
+# Chaque worker ouvre sa connexion SQLite dans son thread et signale toute erreur, ouverture de la base comprise
+# (base verrouillée par un autre processus) : sans signal d'échec, l'interface resterait en attente.
+# Une recherche ou une requête interrompue volontairement n'est pas une erreur et n'est pas signalée.
+from PyQt6.QtCore import QObject, QRunnable, QThread, pyqtSignal
+from db_manager import DBManager
+from log_importer import LogImporter
+from log_watcher import LogWatcher
+
+
+class ImportWorker(QThread):
+    # Thread d'importation des logs : exécute LogImporter hors du thread de l'interface.
+    # La progression est émise en octets et en lignes, et l'annulation (requestInterruption)
+    # annule la transaction du fichier en cours pour garder la base cohérente.
+
+    # qint64 : un int de signal Qt est sur 32 bits, un import de plus de 2 Go ferait déborder les octets lus
+    progress = pyqtSignal('qint64', 'qint64', 'qint64')  # octets lus, octets totaux, lignes lues
+    file_started = pyqtSignal(str)
+    import_finished = pyqtSignal(dict)
+    import_failed = pyqtSignal(str)
+
+    def __init__(self, db_path: str, file_names, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.file_names = list(file_names)
+
+    def run(self):
+        # La connexion SQLite doit être créée dans le thread qui l'utilise.
+        db_manager = None
+        try:
+            db_manager = DBManager(db_path=self.db_path)
+            importer = LogImporter(
+                db_manager,
+                on_progress=self.progress.emit,
+                on_file_started=self.file_started.emit,
+                should_stop=self.isInterruptionRequested,
+                # Premier chargement dans une base vide : les index sont construits une seule fois à la fin
+                bulk_load=db_manager.fetch_max_session_id() == 0,
+            )
+            result = importer.import_files(self.file_names)
+        except Exception as e:
+            self.import_failed.emit(str(e))
+            return
+        finally:
+            if db_manager is not None:
+                db_manager.close()
+
+        self.import_finished.emit(result)
+
+
+class WatchWorker(QThread):
+    # Thread de surveillance d'un dossier de logs : scrute le dossier à intervalle régulier
+    # et émet le nombre de sessions nouvellement insérées par poste pour une mise à jour incrémentale des vues.
+
+    sessions_added = pyqtSignal(dict)  # poste -> nombre de sessions ajoutées
+    watch_failed = pyqtSignal(str)
+
+    POLL_INTERVAL_MS = 5000
+    SLEEP_STEP_MS = 200  # Granularité de l'attente pour réagir vite à l'arrêt
+
+    def __init__(self, db_path: str, directory: str, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.directory = directory
+
+    def run(self):
+        db_manager = None
+        try:
+            db_manager = DBManager(db_path=self.db_path)
+            watcher = LogWatcher(db_manager, self.directory)
+            while not self.isInterruptionRequested():
+                result = watcher.poll(should_stop=self.isInterruptionRequested)
+                if result and result['new_sessions']:
+                    self.sessions_added.emit(result['new_sessions'])
+                waited = 0
+                while waited < self.POLL_INTERVAL_MS and not self.isInterruptionRequested():
+                    self.msleep(self.SLEEP_STEP_MS)
+                    waited += self.SLEEP_STEP_MS
+        except Exception as e:
+            self.watch_failed.emit(str(e))
+        finally:
+            if db_manager is not None:
+                db_manager.close()
+
+
+class SearchWorker(QThread):
+    # Thread de recherche : lit une page des résultats hors du thread de l'interface (la première, ou celle qui suit
+    # la clé de tri after pour le défilement du tableau).
+    # Une recherche remplacée par une frappe plus récente est arrêtée par requestInterruption,
+    # que le progress handler de SQLite vérifie pendant l'exécution de la requête.
+
+    page_ready = pyqtSignal(int, str, list)  # numéro de la recherche, texte recherché, page
+    search_failed = pyqtSignal(int, str)
+
+    def __init__(self, db_path: str, request_id: int, query: str, order: str, page_size: int, parent=None,
+                 after: tuple = None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.request_id = request_id
+        self.query = query
+        self.order = order
+        self.page_size = page_size
+        self.after = after
+
+    def run(self):
+        db_manager = None
+        try:
+            db_manager = DBManager(db_path=self.db_path)
+            db_manager.set_cancel_check(self.isInterruptionRequested)
+            rows = db_manager.fetch_sessions_page(self.order, self.after, self.page_size, self.query)
+        except Exception as e:
+            if not self.isInterruptionRequested():
+                self.search_failed.emit(self.request_id, str(e))
+            return
+        finally:
+            if db_manager is not None:
+                db_manager.close()
+
+        if not self.isInterruptionRequested():
+            self.page_ready.emit(self.request_id, self.query or '', rows)
+
+
+class ChartQuerySignals(QObject):
+    # Signaux d'une ChartQueryTask (un QRunnable ne peut pas émettre de signaux lui-même).
+    result_ready = pyqtSignal(int, object)  # numéro de la requête, données du graphique
+    query_failed = pyqtSignal(int, str)
+
+
+class ChartQueryTask(QRunnable):
+    # Lecture des données d'un graphique dans un thread du QThreadPool de la fenêtre des statistiques.
+    # fetch(db_manager) exécute les requêtes ; cancel() l'interrompt par le progress handler de SQLite
+    # quand un autre graphique est demandé avant la fin, et son résultat n'est alors pas émis.
+
+    def __init__(self, db_path: str, request_id: int, fetch):
+        super().__init__()
+        self.db_path = db_path
+        self.request_id = request_id
+        self.fetch = fetch
+        self.signals = ChartQuerySignals()
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def is_cancelled(self) -> bool:
+        return self.cancelled
+
+    def run(self):
+        if self.cancelled:
+            return
+        db_manager = None
+        try:
+            db_manager = DBManager(db_path=self.db_path)
+            db_manager.set_cancel_check(self.is_cancelled)
+            data = self.fetch(db_manager)
+        except Exception as e:
+            if not self.cancelled:
+                self.signals.query_failed.emit(self.request_id, str(e))
+            return
+        finally:
+            if db_manager is not None:
+                db_manager.close()
+
+        if not self.cancelled:
+            self.signals.result_ready.emit(self.request_id, data)
@@ -0,0 +1,257 @@
+# log_importer.py
+import os
+import hashlib
+from db_manager import DBManager
+from log_parser import LOG_EXTENSIONS, READ_ERRORS, LogFileScanner, is_compressed, open_scanner, update_hash_from_file
+
+
+def collect_log_files(paths, recursive: bool = False):
+    # Développe les dossiers en la liste de leurs fichiers de logs (triés pour un ordre d'import stable).
+    file_names = []
+    for path in paths:
+        if os.path.isdir(path):
+            if recursive:
+                for directory, _, names in os.walk(path):
+                    file_names.extend(os.path.join(directory, name) for name in sorted(names)
+                                      if name.lower().endswith(LOG_EXTENSIONS))
+            else:
+                file_names.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                                  if name.lower().endswith(LOG_EXTENSIONS)
+                                  and os.path.isfile(os.path.join(path, name)))
+        else:
+            file_names.append(path)
+    return file_names
+
+
+class LogImporter:
+    # Pipeline d'import des fichiers de logs, sans dépendance à Qt (utilisé par ImportWorker et par la CLI).
+    # Chaque fichier est validé dans sa propre transaction ; un fichier déjà importé n'est analysé que pour ses ajouts.
+
+    PROGRESS_INTERVAL = 2000  # Nombre de sessions entre deux appels de progression
+    TAIL_GUARD_SIZE = 64 * 1024  # Octets avant l'offset dont le hash vérifie qu'un fichier a seulement grandi
+
+    def __init__(self, db_manager: DBManager, on_progress=None, on_file_started=None, should_stop=None,
+                 bulk_load: bool = False, prefix_hashers: dict = None):
+        # prefix_hashers : fichier -> (offset, hash du préfixe, hasher des octets [0, offset)), complété à chaque import
+        self.db_manager = db_manager
+        self.bulk_load = bulk_load
+        self.prefix_hashers = prefix_hashers if prefix_hashers is not None else {}
+        self.on_progress = on_progress or (lambda bytes_read, total_bytes, lines_read: None)
+        self.on_file_started = on_file_started or (lambda file_name: None)
+        self.should_stop = should_stop or (lambda: False)
+
+    def import_files(self, file_names) -> dict:
+        # Importe les fichiers et retourne le bilan de l'import.
+        db_manager = self.db_manager
+        file_names = list(file_names)
+        result = {
+            'imported_files': [],
+            'already_imported_files': [],
+            'resumed_files': [],
+            'rewritten_files': [],
+            'duplicate_files': [],
+            'failed_files': [],  # (fichier, message) des fichiers illisibles ou archives corrompues, non importés
+            'lines': 0,
+            'bytes': 0,  # Octets parcourus (progression), fichiers ignorés et préfixes déjà importés compris
+            'parsed_bytes': 0,  # Octets réellement analysés, depuis l'offset de reprise de chaque fichier
+            'inserted': 0,
+            'duplicates': 0,
+            'cancelled': False,
+        }
+        total_bytes = sum(self._file_size(file_name) for file_name in file_names)
+
+        if self.bulk_load:
+            # Index secondaires et intervalles reconstruits une seule fois à la fin, même en cas d'annulation ou d'erreur
+            db_manager.begin_bulk_load()
+        try:
+            for file_name in file_names:
+                if self.should_stop():
+                    result['cancelled'] = True
+                    break
+
+                bytes_before = result['bytes']
+                try:
+                    completed = self._import_one_file(file_name, result, total_bytes)
+                except READ_ERRORS as e:
+                    # Fichier illisible ou archive corrompue : seul ce fichier est annulé, l'import continue
+                    db_manager.rollback()
+                    result['failed_files'].append((file_name, str(e) or type(e).__name__))
+                    result['bytes'] = bytes_before + self._file_size(file_name)
+                    self.on_progress(result['bytes'], total_bytes, result['lines'])
+                    continue
+                if not completed:
+                    # Annulation en cours de fichier : rien de ce fichier n'est conservé
+                    db_manager.rollback()
+                    result['cancelled'] = True
+                    break
+        except Exception:
+            db_manager.rollback()
+            raise
+        finally:
+            if self.bulk_load:
+                db_manager.end_bulk_load()
+
+        return result
+
+    def _import_one_file(self, file_name: str, result: dict, total_bytes: int) -> bool:
+        # Importe un fichier dans sa propre transaction et complète le bilan. Retourne False si l'import a été annulé
+        # (transaction à annuler par l'appelant).
+        db_manager = self.db_manager
+        status, start_offset, hasher = self._check_file_state(file_name)
+        expected_end = None
+        if status in ('new', 'rewritten'):
+            # Avant toute analyse : une copie identique (clé USB, autre partage) est ignorée, et un fichier qui commence
+            # comme un fichier déjà importé n'est analysé qu'à partir de la fin du préfixe commun
+            start_offset, hasher, content_hash, expected_end = self._match_known_prefix(file_name)
+            size = expected_end[0]
+            if db_manager.is_content_imported(size, content_hash) or 0 < start_offset == size:
+                # Contenu identique à un fichier déjà importé (ligne finale inachevée comprise) :
+                # rien à analyser, l'état enregistré permet de reprendre ses ajouts
+                stat = os.stat(file_name)
+                db_manager.mark_file_imported(file_name, stat.st_size, stat.st_mtime_ns,
+                                              start_offset, hasher.hexdigest(), content_hash,
+                                              self._tail_hash(file_name, start_offset))
+                db_manager.commit()
+                self.prefix_hashers[file_name] = (start_offset, hasher.hexdigest(), hasher)
+                result['duplicate_files'].append(file_name)
+                result['bytes'] += stat.st_size
+                self.on_progress(result['bytes'], total_bytes, result['lines'])
+                return True
+
+        if status == 'unchanged':
+            result['already_imported_files'].append(file_name)
+            result['bytes'] += self._file_size(file_name)
+            self.on_progress(result['bytes'], total_bytes, result['lines'])
+            return True
+
+        self.on_file_started(file_name)
+        stat = os.stat(file_name)
+        scanner = open_scanner(file_name, start_offset)
+        if not self._import_file(scanner, result, total_bytes):
+            return False
+
+        if (expected_end is not None and expected_end[:2] == (stat.st_size, scanner.resume_offset)
+                and scanner.offset == stat.st_size):
+            # Fichier inchangé depuis le passage de _match_known_prefix : ses hash sont déjà calculés
+            hasher = expected_end[2]
+        else:
+            # Reprise, ou fichier modifié pendant l'analyse : le hash du préfixe est prolongé avec les octets qui
+            # viennent d'être importés, puis, sur une copie, avec la ligne finale inachevée pour le fichier entier
+            update_hash_from_file(hasher, file_name, start_offset, scanner.resume_offset)
+            content_hash = update_hash_from_file(hasher.copy(), file_name, scanner.resume_offset,
+                                                 stat.st_size).hexdigest()
+        db_manager.mark_file_imported(file_name, stat.st_size, stat.st_mtime_ns,
+                                      scanner.resume_offset, hasher.hexdigest(), content_hash,
+                                      self._tail_hash(file_name, scanner.resume_offset))
+        db_manager.commit()
+        self.prefix_hashers[file_name] = (scanner.resume_offset, hasher.hexdigest(), hasher)
+        result['imported_files'].append(file_name)
+        if status == 'appended':
+            result['resumed_files'].append(file_name)
+        elif status == 'rewritten':
+            result['rewritten_files'].append(file_name)
+        self.on_progress(result['bytes'], total_bytes, result['lines'])
+        return True
+
+    def _check_file_state(self, file_name: str):
+        # Compare le fichier à son état d'import enregistré.
+        # Retourne (statut, offset de reprise, hash du préfixe déjà importé) avec statut parmi
+        # 'new', 'unchanged', 'appended' (le fichier a grandi) ou 'rewritten' (réécrit ou rotation).
+        # Le préfixe déjà importé est vérifié par son hash complet, sauf si son hasher a été gardé par un import
+        # précédent (prefix_hashers, partagé par les passages de LogWatcher) : seuls ses derniers octets (tail_hash)
+        # sont alors relus, et le coût d'une reprise ne dépend plus que des octets ajoutés.
+        record = self.db_manager.get_imported_file(file_name)
+        if record is None:
+            return 'new', 0, hashlib.blake2b()
+        if record['offset'] is None:
+            # Import antérieur au suivi incrémental : aucun moyen de reprendre
+            return 'unchanged', 0, None
+
+        stat = os.stat(file_name)
+        if stat.st_size == record['size'] and stat.st_mtime_ns == record['mtime_ns']:
+            return 'unchanged', 0, None
+        if stat.st_size >= record['offset']:
+            cached = self.prefix_hashers.get(file_name)
+            if (cached is not None and cached[:2] == (record['offset'], record['prefix_hash'])
+                    and record['tail_hash'] is not None
+                    and self._tail_hash(file_name, record['offset']) == record['tail_hash']):
+                # Préfixe importé par ce processus et derniers octets inchangés : le hasher gardé est prolongé
+                hasher = cached[2].copy()
+            else:
+                hasher = update_hash_from_file(hashlib.blake2b(), file_name, 0, record['offset'])
+            if hasher.hexdigest() == record['prefix_hash']:
+                if stat.st_size == record['offset']:
+                    return 'unchanged', 0, None
+                if not is_compressed(file_name):
+                    return 'appended', record['offset'], hasher
+        return 'rewritten', 0, hashlib.blake2b()
+
+    def _tail_hash(self, file_name: str, offset: int) -> str:
+        # Hash des TAIL_GUARD_SIZE octets qui précèdent offset (moins en début de fichier)
+        return update_hash_from_file(hashlib.blake2b(), file_name,
+                                     max(0, offset - self.TAIL_GUARD_SIZE), offset).hexdigest()
+
+    def _match_known_prefix(self, file_name: str):
+        # Cherche le plus long préfixe du fichier déjà importé ailleurs, en un seul passage de hash
+        # qui s'arrête à chaque offset connu puis va jusqu'à la fin du fichier.
+        # Retourne (offset de reprise, hash du préfixe commun, hash du fichier entier, état de fin d'import) ;
+        # l'état de fin d'import (taille, offset de reprise attendu après analyse, hasher à cet offset) évite de
+        # relire le fichier pour les hash à enregistrer, tant qu'il n'a pas changé pendant l'analyse.
+        size = self._file_size(file_name)
+        prefixes = self.db_manager.fetch_imported_prefixes(size)
+        hasher = hashlib.blake2b()
+        best_offset, best_hasher = 0, hashlib.blake2b()
+        line_end = {'offset': 0, 'hasher': hashlib.blake2b()}
+        position = 0
+        for offset in sorted(prefixes):
+            update_hash_from_file(hasher, file_name, position, offset, line_end)
+            position = offset
+            if hasher.hexdigest() in prefixes[offset]:
+                best_offset, best_hasher = offset, hasher.copy()
+        content_hash = update_hash_from_file(hasher, file_name, position, size, line_end).hexdigest()
+        if is_compressed(file_name):
+            # Une archive ne se reprend pas au milieu : seule une copie identique compte, sinon elle est réimportée en
+            # entier (les doublons sont alors ignorés par la contrainte UNIQUE)
+            if best_offset != size:
+                best_offset, best_hasher = 0, hashlib.blake2b()
+            return best_offset, best_hasher, content_hash, (size, size, hasher)
+        if line_end['offset'] <= best_offset:
+            # Pas de ligne complète après le préfixe commun : l'analyse reprendra au même offset
+            return best_offset, best_hasher, content_hash, (size, best_offset, best_hasher.copy())
+        return best_offset, best_hasher, content_hash, (size, line_end['offset'], line_end['hasher'])
+
+    def _import_file(self, scanner: LogFileScanner, result: dict, total_bytes: int) -> bool:
+        # Analyse un fichier et insère ses sessions par paquets. Retourne False si l'import a été annulé.
+        state = {'cancelled': False}
+        rows = self._parse_file(scanner, result, total_bytes, state)
+        inserted, duplicates = self.db_manager.insert_sessions(rows)
+        if state['cancelled']:
+            return False
+        result['inserted'] += inserted
+        result['duplicates'] += duplicates
+        return True
+
+    def _parse_file(self, scanner: LogFileScanner, result: dict, total_bytes: int, state: dict):
+        # Générateur des sessions d'un fichier ; s'arrête dès qu'un arrêt est demandé.
+        bytes_before, lines_before, parsed_before = result['bytes'], result['lines'], result['parsed_bytes']
+        for row_number, row in enumerate(scanner, start=1):
+            yield row
+            if row_number % self.PROGRESS_INTERVAL == 0:
+                result['bytes'] = bytes_before + scanner.offset
+                result['lines'] = lines_before + scanner.lines
+                self.on_progress(result['bytes'], total_bytes, result['lines'])
+                if self.should_stop():
+                    state['cancelled'] = True
+                    result['parsed_bytes'] = parsed_before + scanner.offset - scanner.start_offset
+                    return
+        result['bytes'] = bytes_before + scanner.offset
+        result['lines'] = lines_before + scanner.lines
+        result['parsed_bytes'] = parsed_before + scanner.offset - scanner.start_offset
+
+    @staticmethod
+    def _file_size(file_name: str) -> int:
+        # Taille du fichier en octets (0 s'il n'est pas accessible)
+        try:
+            return os.path.getsize(file_name)
+        except OSError:
+            return 0
@@ -0,0 +1,276 @@
+# log_parser.py
+import os
+import re
+import bz2
+import gzip
+import lzma
+import mmap
+import zipfile
+from datetime import datetime
+
+
+# L'import lit les fichiers par LogFileScanner (motif en octets ci-dessous). Les analyseurs de lignes str
+# parse_line_regex et parse_line ne servent que de référence : bench_log_parser.py vérifie que le scanner
+# produit les mêmes sessions qu'eux et compare les temps.
+
+# Expression régulière pour extraire les informations des lignes de log (référence, et secours de parse_line)
+LOG_PATTERN = re.compile(
+    r'\[(LOGON\.|LOGOFF)\] (\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2}) '
+    r'Computer="([^"]+)" User="([^"]+)"'
+)
+
+# Même motif en octets, appliqué directement sur le fichier projeté en mémoire.
+# Les champs excluent le saut de ligne pour qu'une correspondance ne déborde jamais sur la ligne suivante.
+LOG_PATTERN_BYTES = re.compile(
+    rb'\[(LOGON\.|LOGOFF)\] (\d{2}/\d{2}/\d{4}) (\d{2}:\d{2}:\d{2}) '
+    rb'Computer="([^"\n]+)" User="([^"\n]+)"'
+)
+_EVENTS_BYTES = {b'LOGON.': 'LOGON', b'LOGOFF': 'LOGOFF'}
+
+# Disposition fixe d'une ligne :
+# [LOGON.] 01/11/2024 08:02:53 Computer="PC-LAB-03" User="FAKE-CORP\sarah.garcia"
+_EVENTS = {'[LOGON.] ': 'LOGON', '[LOGOFF] ': 'LOGOFF'}
+_DATE_START, _DATE_END = 9, 19
+_TIME_START, _TIME_END = 20, 28
+_COMPUTER_PREFIX = ' Computer="'
+_COMPUTER_START = _TIME_END + len(_COMPUTER_PREFIX)
+_USER_PREFIX = '" User="'
+
+# Cache des dates déjà converties "dd/mm/yyyy" -> "yyyy-mm-dd" (un fichier ne contient que quelques dates)
+_DATE_CACHE_SIZE = 4096
+_date_cache = {}
+
+
+def _iso_date(date_str: str) -> str:
+    # Convertit une date "dd/mm/yyyy" en "yyyy-mm-dd", avec mémorisation.
+    iso_date = _date_cache.get(date_str)
+    if iso_date is None:
+        # strptime valide la date exactement comme le chemin regex
+        iso_date = datetime.strptime(date_str, "%d/%m/%Y").strftime("%Y-%m-%d")
+        if len(_date_cache) >= _DATE_CACHE_SIZE:
+            _date_cache.clear()
+        _date_cache[date_str] = iso_date
+    return iso_date
+
+
+def parse_line_regex(line: str):
+    # Analyse une ligne avec l'expression régulière. Retourne (event, timestamp, computer, user) ou None.
+    match = LOG_PATTERN.search(line)
+    if not match:
+        return None
+    event = match.group(1).replace('.', '')
+    dt = datetime.strptime(match.group(2), "%d/%m/%Y %H:%M:%S")
+    timestamp = dt.strftime("%Y-%m-%d %H:%M:%S")
+    return event, timestamp, match.group(3), match.group(4)
+
+
+def parse_line(line: str):
+    # Analyse une ligne par découpage à positions fixes ; bascule sur la regex si la ligne
+    # ne respecte pas exactement la disposition attendue. Retourne le même tuple que parse_line_regex.
+    event = _EVENTS.get(line[:9])
+    if event is None or line[28:_COMPUTER_START] != _COMPUTER_PREFIX:
+        return parse_line_regex(line)
+
+    date_str = line[_DATE_START:_DATE_END]
+    time_str = line[_TIME_START:_TIME_END]
+    digits = date_str[0:2] + date_str[3:5] + date_str[6:10] + time_str[0:2] + time_str[3:5] + time_str[6:8]
+    if not (
+        date_str[2] == '/' and date_str[5] == '/' and line[_DATE_END] == ' '
+        and time_str[2] == ':' and time_str[5] == ':'
+        and digits.isascii() and digits.isdigit()
+        and time_str[0:2] < '24' and time_str[3:5] < '60' and time_str[6:8] < '60'
+    ):
+        return parse_line_regex(line)
+
+    computer_end = line.find(_USER_PREFIX, _COMPUTER_START)
+    if computer_end <= _COMPUTER_START or '"' in line[_COMPUTER_START:computer_end]:
+        return parse_line_regex(line)
+    user_start = computer_end + len(_USER_PREFIX)
+    user_end = line.find('"', user_start)
+    if user_end <= user_start:
+        return parse_line_regex(line)
+
+    timestamp = _iso_date(date_str) + ' ' + time_str
+    return event, timestamp, line[_COMPUTER_START:computer_end], line[user_start:user_end]
+
+
+_COUNT_CHUNK_SIZE = 1 << 20
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+def update_hash_from_file(hasher, file_name: str, start: int, end: int, line_end: dict = None):
+    # Ajoute au hash les octets [start, end) du fichier, lus par blocs.
+    # Avec line_end, y garde la position qui suit le dernier saut de ligne lu ('offset') et une copie du hasher
+    # à cette position ('hasher'), sans relire le fichier.
+    with open(file_name, "rb") as file:
+        file.seek(start)
+        position = start
+        while position < end:
+            chunk = file.read(min(_HASH_CHUNK_SIZE, end - position))
+            if not chunk:
+                break
+            cut = chunk.rfind(b'\n') + 1 if line_end is not None else 0
+            if cut:
+                view = memoryview(chunk)
+                hasher.update(view[:cut])
+                line_end['offset'], line_end['hasher'] = position + cut, hasher.copy()
+                hasher.update(view[cut:])
+            else:
+                hasher.update(chunk)
+            position += len(chunk)
+    return hasher
+
+
+def _count_newlines(buffer, start: int, end: int) -> int:
+    # Compte les sauts de ligne d'une zone du mmap par blocs bornés (mmap n'a pas de méthode count).
+    count = 0
+    while start < end:
+        chunk_end = min(end, start + _COUNT_CHUNK_SIZE)
+        count += buffer[start:chunk_end].count(b'\n')
+        start = chunk_end
+    return count
+
+
+class LogFileScanner:
+    # Parcourt un fichier de logs projeté en mémoire (mmap) avec la regex en octets :
+    # le fichier n'est jamais découpé en lignes Python et seuls les champs poste/utilisateur sont décodés.
+    # offset et lines indiquent la progression (octets et lignes consommés) pendant l'itération.
+
+    compressed = False
+
+    def __init__(self, file_name: str, start_offset: int = 0):
+        self.file_name = file_name
+        self.start_offset = start_offset
+        self.offset = start_offset
+        self.lines = 0
+        self.resume_offset = start_offset  # Position après la dernière ligne complète lue
+
+    def __iter__(self):
+        with open(self.file_name, "rb") as file:
+            try:
+                buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                return  # Fichier vide : mmap refuse une projection de taille nulle
+            try:
+                yield from self._scan(buffer)
+            finally:
+                buffer.close()
+
+    def _scan(self, buffer):
+        size = len(buffer)
+        for position, row in self._scan_region(buffer, self.start_offset, size):
+            self.offset = position
+            yield row
+
+        if size > self.start_offset and buffer[size - 1:size] != b'\n':
+            self.lines += 1  # Dernière ligne sans saut de ligne final
+        self.offset = size
+        # Une dernière ligne incomplète (fichier en cours d'écriture) sera relue au prochain import
+        self.resume_offset = max(self.start_offset, buffer.rfind(b'\n', self.start_offset) + 1)
+
+    def _scan_region(self, buffer, position: int, end: int):
+        # Cherche les sessions dans buffer[position:end] ; produit (position après la ligne, session)
+        # et compte les lignes parcourues dans self.lines.
+        search = LOG_PATTERN_BYTES.search
+        while position < end:
+            match = search(buffer, position, end)
+            if match is None:
+                break
+            # Comme en lecture ligne par ligne, seule la première correspondance d'une ligne compte
+            line_end = buffer.find(b'\n', match.end(), end)
+            next_position = end if line_end < 0 else line_end + 1
+            self.lines += _count_newlines(buffer, position, next_position)
+            position = next_position
+            yield position, self._to_row(match)
+        self.lines += _count_newlines(buffer, position, end)
+
+    @staticmethod
+    def _to_row(match):
+        event, date_bytes, time_bytes, computer, user = match.groups()
+        date_str = date_bytes.decode("ascii")
+        time_str = time_bytes.decode("ascii")
+        if not (time_str[0:2] < '24' and time_str[3:5] < '60' and time_str[6:8] < '60'):
+            # Heure invalide : lève la même erreur que la conversion par strptime
+            datetime.strptime(f"{date_str} {time_str}", "%d/%m/%Y %H:%M:%S")
+        return _EVENTS_BYTES[event], _iso_date(date_str) + ' ' + time_str, computer.decode("utf-8"), user.decode("utf-8")
+
+
+class CompressedLogScanner(LogFileScanner):
+    # Parcourt une archive compressée (.gz, .bz2, .xz ou membres .log d'un .zip) comme un flux :
+    # les données décompressées sont lues par blocs et ne sont jamais écrites sur disque.
+    # offset mesure les octets compressés consommés, pour une progression cohérente avec la taille du fichier.
+    # Un flux compressé ne permet pas de reprise : l'archive est toujours lue en entier.
+
+    compressed = True
+    READ_SIZE = 1 << 20
+
+    def __init__(self, file_name: str, start_offset: int = 0):
+        super().__init__(file_name, 0)
+
+    def __iter__(self):
+        with open(self.file_name, "rb") as raw_file:
+            size = os.fstat(raw_file.fileno()).st_size
+            if self.file_name.lower().endswith('.zip'):
+                with zipfile.ZipFile(raw_file) as archive:
+                    members = sorted((info for info in archive.infolist()
+                                      if info.filename.lower().endswith('.log') and not info.is_dir()),
+                                     key=lambda info: info.filename)
+                    consumed = 0
+                    for info in members:
+                        with archive.open(info) as stream:
+                            # Progression estimée au prorata de la taille compressée du membre
+                            yield from self._scan_stream(
+                                stream,
+                                lambda done, base=consumed, info=info:
+                                    base + info.compress_size * done // max(info.file_size, 1))
+                        consumed += info.compress_size
+            else:
+                opener = _STREAM_OPENERS[os.path.splitext(self.file_name.lower())[1]]
+                with opener(raw_file) as stream:
+                    yield from self._scan_stream(stream, lambda done: raw_file.tell())
+        self.offset = size
+        self.resume_offset = size
+
+    def _scan_stream(self, stream, compressed_position):
+        # Lit le flux décompressé par blocs de lignes complètes et y applique la regex en octets.
+        pending = b''
+        decompressed = 0
+        while True:
+            data = stream.read(self.READ_SIZE)
+            if not data:
+                break
+            decompressed += len(data)
+            buffer = pending + data
+            cut = buffer.rfind(b'\n') + 1
+            for _, row in self._scan_region(buffer, 0, cut):
+                yield row
+            pending = buffer[cut:]
+            self.offset = compressed_position(decompressed)
+        if pending:
+            for _, row in self._scan_region(pending, 0, len(pending)):
+                yield row
+            self.lines += 1  # Dernière ligne sans saut de ligne final
+
+
+# Ouverture en flux des formats compressés pris en charge par la bibliothèque standard
+_STREAM_OPENERS = {
+    '.gz': lambda raw_file: gzip.GzipFile(fileobj=raw_file),
+    '.bz2': lambda raw_file: bz2.BZ2File(raw_file),
+    '.xz': lambda raw_file: lzma.LZMAFile(raw_file),
+}
+COMPRESSED_EXTENSIONS = tuple(_STREAM_OPENERS) + ('.zip',)
+LOG_EXTENSIONS = ('.log',) + COMPRESSED_EXTENSIONS
+# Erreurs de lecture d'un fichier illisible, tronqué ou d'une archive corrompue
+READ_ERRORS = (EOFError, gzip.BadGzipFile, zipfile.BadZipFile, lzma.LZMAError, OSError)
+
+
+def is_compressed(file_name: str) -> bool:
+    # Indique si le fichier est une archive lue en flux.
+    return file_name.lower().endswith(COMPRESSED_EXTENSIONS)
+
+
+def open_scanner(file_name: str, start_offset: int = 0) -> LogFileScanner:
+    # Retourne le lecteur adapté au fichier : mmap pour un .log, flux pour une archive compressée.
+    if is_compressed(file_name):
+        return CompressedLogScanner(file_name)
+    return LogFileScanner(file_name, start_offset)
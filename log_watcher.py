@@ -0,0 +1,47 @@
+# log_watcher.py
+import os
+from db_manager import DBManager
+from log_importer import LogImporter, collect_log_files
+
+
+class LogWatcher:
+    # Surveillance d'un dossier de logs par scrutation (polling), sans dépendance à Qt ni au système de fichiers.
+    # À chaque appel de poll(), seuls les fichiers dont la taille ou la date de modification a changé
+    # sont passés à LogImporter, qui ne lit que les octets ajoutés depuis le dernier import.
+
+    def __init__(self, db_manager: DBManager, directory: str, recursive: bool = False):
+        self.db_manager = db_manager
+        self.directory = directory
+        self.recursive = recursive
+        self._known_states = {}  # fichier -> (taille, mtime_ns) lors du dernier passage
+        self._prefix_hashers = {}  # Hashers des préfixes importés, pour reprendre sans relire (voir LogImporter)
+
+    def changed_files(self):
+        # Retourne les fichiers de logs apparus ou modifiés depuis le dernier passage.
+        changed = []
+        for file_name in collect_log_files([self.directory], self.recursive):
+            try:
+                stat = os.stat(file_name)
+            except OSError:
+                continue  # Fichier supprimé ou renommé entre-temps
+            if self._known_states.get(file_name) != (stat.st_size, stat.st_mtime_ns):
+                changed.append(file_name)
+        return changed
+
+    def poll(self, should_stop=None):
+        # Importe les nouvelles lignes des fichiers modifiés.
+        # Retourne le bilan de l'import complété par 'new_sessions' (nombre de sessions ajoutées par poste),
+        # ou None si aucun fichier n'a changé.
+        file_names = self.changed_files()
+        if not file_names:
+            return None
+
+        last_id = self.db_manager.fetch_max_session_id()
+        result = LogImporter(self.db_manager, should_stop=should_stop,
+                             prefix_hashers=self._prefix_hashers).import_files(file_names)
+        for file_name in result['imported_files'] + result['already_imported_files'] + result['duplicate_files']:
+            record = self.db_manager.get_imported_file(file_name)
+            if record is not None:
+                self._known_states[file_name] = (record['size'], record['mtime_ns'])
+        result['new_sessions'] = self.db_manager.fetch_new_sessions_per_computer(last_id)
+        return result
@@ -1,16 +1,88 @@
 # main.py
 import sys
 import os
-from PyQt6.QtWidgets import QApplication
+import shutil
+import sqlite3
+import argparse
+import tempfile
+from datetime import datetime
+from PyQt6.QtWidgets import QApplication, QMessageBox
+from db_manager import DBManager, SchemaVersionError
 from main_window import MainWindow
 
+DB_PATH = 'logs.db'  # Base conservée avec --persistent : la même que celle de cli.py par défaut
+DB_FILE_SUFFIXES = ('', '-wal', '-shm', '-bulk.lock')  # Base, journal WAL et verrou de chargement en masse
+
+
+def parse_args(argv):
+    # Options de l'application ; les options restantes sont laissées à Qt.
+    parser = argparse.ArgumentParser(description="Gestion des logs de connexion")
+    parser.add_argument('--persistent', action='store_true',
+                        help="conserver la base entre deux lancements au lieu de repartir d'une base vide")
+    parser.add_argument('--db', help="chemin de la base SQLite. Avec --persistent, logs.db par défaut (la base de cli.py). "
+                                     "Sans --persistent, une base temporaire par défaut ; une base indiquée ici est "
+                                     "vidée au lancement et supprimée à la fermeture")
+    return parser.parse_known_args(argv[1:])
+
+
+def remove_database(db_path):
+    for suffix in DB_FILE_SUFFIXES:
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+
+def check_database(db_path):
+    # Ouvre la base conservée (migrations comprises) et vérifie son intégrité.
+    # Une base illisible est mise de côté et remplacée par une base vide ; retourne le message à afficher, ou None.
+    if not os.path.exists(db_path):
+        return None
+    try:
+        db_manager = DBManager(db_path=db_path)
+        try:
+            problems = db_manager.check_integrity()
+        finally:
+            db_manager.close()
+    except SchemaVersionError:
+        raise
+    except sqlite3.DatabaseError as e:
+        problems = [str(e)]
+    if not problems:
+        return None
+    backup_path = f"{db_path}.corrompue-{datetime.now():%Y%m%d-%H%M%S}"
+    for suffix in DB_FILE_SUFFIXES:
+        if os.path.exists(db_path + suffix):
+            os.replace(db_path + suffix, backup_path + suffix)
+    return (f"La base '{db_path}' est endommagée et a été mise de côté sous '{backup_path}'.\n"
+            "Une nouvelle base vide est utilisée.\n\n" + "\n".join(problems[:10]))
+
+
 def main():
-    if os.path.exists('logs.db'):
-        os.remove('logs.db')
-    app = QApplication(sys.argv)
-    window = MainWindow()
+    args, qt_args = parse_args(sys.argv)
+    db_path = args.db
+    temporary_directory = None
+    if db_path is None and args.persistent:
+        db_path = DB_PATH
+    elif db_path is None:
+        # Base jetable dans un dossier temporaire : la base logs.db du dossier courant, alimentée par cli.py, est épargnée
+        temporary_directory = tempfile.mkdtemp(prefix='logs-')
+        db_path = os.path.join(temporary_directory, DB_PATH)
+    if not args.persistent:
+        remove_database(db_path)
+    app = QApplication(sys.argv[:1] + qt_args)
+    if args.persistent:
+        try:
+            message = check_database(db_path)
+        except SchemaVersionError as e:
+            QMessageBox.critical(None, "Base de données trop récente", str(e))
+            sys.exit(1)
+        if message:
+            QMessageBox.warning(None, "Base de données endommagée", message)
+    window = MainWindow(db_path=db_path, persistent=args.persistent)
     window.show()
-    sys.exit(app.exec())
+    exit_code = app.exec()
+    if temporary_directory is not None:
+        shutil.rmtree(temporary_directory, ignore_errors=True)
+    sys.exit(exit_code)
 
 if __name__ == "__main__":
     main()
@@ -1,27 +1,40 @@
 # main_window.py
 import os
-import re
-from datetime import datetime
+import sqlite3
+from PyQt6.QtCore import QTimer
 from PyQt6.QtWidgets import QMainWindow, QFileDialog, QMessageBox, QPushButton, QProgressBar
-from PyQt6.QtGui import QStandardItemModel, QStandardItem
 from PyQt6.uic import loadUi
 from db_manager import DBManager
 from chart import BarChart
+from session_table_model import SessionTableModel
+from import_worker import ImportWorker, WatchWorker, SearchWorker
+from log_parser import LOG_EXTENSIONS
 
 
 class MainWindow(QMainWindow):
     # Fenêtre principale de l'application de gestion des logs.
-    def __init__(self):
+
+    SEARCH_DEBOUNCE_MS = 250  # Délai sans frappe avant de lancer la recherche
+    CLEAR_DATABASE_TIMEOUT = 1  # Attente maximale (secondes) de la base occupée avant de renoncer à la vider
+    def __init__(self, db_path: str = 'logs.db', persistent: bool = False):
         super().__init__()
         ui_path = os.path.join(os.path.dirname(__file__), "gui.ui")  # Update the UI file path
         loadUi(ui_path, self)
         self.bar_chart_window = None
+        self.import_worker = None
+        self.watch_worker = None
+        self.search_workers = []  # Recherches en cours (une recherche remplacée s'arrête d'elle-même)
+        self.search_request_id = 0
         
-        # Initialiser le gestionnaire de base de données
-        self.db_manager = DBManager(db_path='logs.db')
+        # Initialiser le gestionnaire de base de données (conservée à la fermeture si persistent)
+        self.db_path = db_path
+        self.persistent = persistent
+        self.db_manager = DBManager(db_path=self.db_path)
         
-        # Initialiser le modèle pour le QTableView
-        self.model = QStandardItemModel()
+        # Initialiser le modèle pour le QTableView (lignes lues page par page à la demande)
+        self.model = SessionTableModel(self.db_manager)
+        self.model.page_failed.connect(lambda message: self.statusbar.showMessage(
+            f"Erreur de lecture des sessions : {message}", 5000))
         self.tableView.setModel(self.model)
 
         # Masquer le QTableView et la barre de recherche au démarrage
@@ -32,9 +45,24 @@ class MainWindow(QMainWindow):
         self.progressBarLogImport = self.findChild(QProgressBar, 'progressBarLogImport')
         self.progressBarLogImport.hide()  # Masquer la barre de progression au démarrage
 
+        # Bouton d'annulation de l'import, affiché dans la barre d'état pendant un import
+        self.cancelImportButton = QPushButton("Annuler l'import")
+        self.statusbar.addPermanentWidget(self.cancelImportButton)
+        self.cancelImportButton.hide()
+
+        # Recherche au fil de la frappe, lancée après une pause
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DEBOUNCE_MS)
+
         # Connecter les signaux de l'interface aux slots
         self._setup_signals()
 
+        # Base conservée d'un lancement précédent : ses sessions sont affichées directement
+        if self.db_manager.fetch_max_session_id() > 0:
+            self.importLogButton_2.hide()
+            self.display_data()
+
     def _setup_signals(self):
         # Connecte les signaux aux slots appropriés.
 
@@ -46,27 +74,45 @@ class MainWindow(QMainWindow):
         self.statButton.clicked.connect(self.show_charts)
         self.searchLogButton.clicked.connect(self.show_or_hide_search_bar)
         self.lineEdit.returnPressed.connect(self.search_in_logs)  # Connecter le bouton de recherche
+        self.lineEdit.textChanged.connect(self.search_timer.start)  # Relance le délai à chaque frappe
+        self.search_timer.timeout.connect(self.search_in_logs)
         self.resetButton.clicked.connect(self.clear_database)
 
         # Connecter le bouton d'importation de logs
         self.importLogButton.clicked.connect(self.open_file)
         self.importLogButton_2.clicked.connect(self.open_file)  # Pour le drag and drop
+        self.cancelImportButton.clicked.connect(self.cancel_import)
+
+        # Surveillance continue d'un dossier de logs
+        self.watchButton.toggled.connect(self.toggle_watch)
+
     def sort_sessions(self, criteria: str):
-        # Trie les sessions selon le critère fourni.
-        if criteria == "name":
-            self.model.sort(4)
-        elif criteria == "date":
-            self.model.sort(2)
-        elif criteria == "computer":
-            self.model.sort(3)
+        # Trie les sessions selon le critère fourni ("date", "computer" ou "name") : le tableau est relu
+        # depuis la base dans l'ordre d'un index, page par page.
+        self.model.reload(order=criteria)
 
 
     
     def clear_database(self):
         # Supprime toutes les données des tables sessions et imported_files
-        self.db_manager.clear_database()
+        if self.watch_worker and self.watch_worker.isRunning():
+            # La surveillance réimporterait aussitôt le dossier surveillé : elle est arrêtée avant de vider la base
+            self.watchButton.setChecked(False)
+            self.watch_worker.wait()
+        try:
+            # Attente courte : le thread de l'interface ne reste pas figé derrière une écriture d'un autre thread
+            # ou processus (chargement en masse par cli.py par exemple)
+            self.db_manager.clear_database(timeout=self.CLEAR_DATABASE_TIMEOUT)
+        except sqlite3.OperationalError:
+            QMessageBox.warning(self, "Base occupée",
+                                "La base de données est en cours d'écriture (import en cours ?).\n"
+                                "Réessayez une fois l'écriture terminée.")
+            return
         self.lineEdit.clear()
-        self.model.removeRows(0, self.model.rowCount())  # Efface les données affichées
+        self.search_timer.stop()
+        self._cancel_searches()
+        self.search_request_id += 1  # Les résultats d'une recherche en cours sont ignorés
+        self.model.clear()  # Efface les données affichées
         QMessageBox.information(self, "Succès", "La base de données a été vidée avec succès.")
         
 
@@ -76,69 +122,153 @@ class MainWindow(QMainWindow):
             self,
             'Ouvrir fichier(s)',
             os.getcwd(),
-            'Fichiers log (*.log)'
+            'Fichiers log (*.log *.gz *.bz2 *.xz *.zip)'
         )
         if file_names:
             self.import_logs(file_names)
 
     def import_logs(self, file_names):
-        # Importe les fichiers de logs sélectionnés dans la base de données.
-        # Expression régulière pour extraire les informations des lignes de log
-        pattern = re.compile(
-            r'\[(LOGON\.|LOGOFF)\] (\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2}) '
-            r'Computer="([^"]+)" User="([^"]+)"'
-        )
+        # Lance l'import des fichiers de logs sélectionnés dans un thread de travail.
+        if self.import_worker and self.import_worker.isRunning():
+            QMessageBox.warning(self, "Import en cours",
+                                "Un import est déjà en cours, veuillez patienter ou l'annuler.")
+            return
 
-        total_files = len(file_names)
-        self.progressBarLogImport.setMaximum(total_files)
+        # La progression est exprimée en pour mille des octets lus (les tailles peuvent dépasser un int 32 bits)
+        self.progressBarLogImport.setMaximum(1000)
         self.progressBarLogImport.setValue(0)
         self.progressBarLogImport.show()
+        self.cancelImportButton.show()
+        self.importLogButton.setEnabled(False)
+        self.importLogButton_2.setEnabled(False)
+        self.resetButton.setEnabled(False)  # La base ne peut pas être vidée pendant l'import
 
-        already_imported_files = []
-
-        for index, file_name in enumerate(file_names):
-            if self.db_manager.is_file_imported(file_name):
-                already_imported_files.append(file_name)
-                continue
-
-            with open(file_name, "r", encoding="utf-8") as file:
-                for line in file:
-                    match = pattern.search(line)
-                    if match:
-                        event = match.group(1).replace('.', '')
-                        timestamp = match.group(2)  # format "dd/mm/yyyy hh:mm:ss"
-                        dt = datetime.strptime(timestamp, "%d/%m/%Y %H:%M:%S")
-                        timestamp = dt.strftime("%Y-%m-%d %H:%M:%S")
-                        computer = match.group(3)
-                        user = match.group(4)
-                        self.db_manager.insert_session(event, timestamp, computer, user)
-
-            self.db_manager.mark_file_imported(file_name)
-            self.progressBarLogImport.setValue(index + 1)
-
-        self.db_manager.commit()
-        self.importLogButton_2.hide()  # Masquer le bouton après importation
+        self.import_worker = ImportWorker(self.db_path, file_names, self)
+        self.import_worker.progress.connect(self.on_import_progress)
+        self.import_worker.file_started.connect(self.on_import_file_started)
+        self.import_worker.import_finished.connect(self.on_import_finished)
+        self.import_worker.import_failed.connect(self.on_import_failed)
+        self.import_worker.start()
+
+    def cancel_import(self):
+        # Demande l'arrêt de l'import en cours (le fichier en cours d'analyse est annulé).
+        if self.import_worker and self.import_worker.isRunning():
+            self.import_worker.requestInterruption()
+            self.cancelImportButton.setEnabled(False)
+
+    def on_import_file_started(self, file_name):
+        # Affiche le fichier en cours d'import dans la barre d'état.
+        self.statusbar.showMessage(f"Import de {os.path.basename(file_name)}...")
+
+    def on_import_progress(self, bytes_read, total_bytes, lines_read):
+        # Met à jour la barre de progression (octets) et le compteur de lignes.
+        if total_bytes > 0:
+            self.progressBarLogImport.setValue(min(1000, bytes_read * 1000 // total_bytes))
+        self.progressBarLogImport.setFormat(f"%p% - {lines_read} lignes")
+        self.statusbar.showMessage(
+            f"{bytes_read / 1048576:.1f} / {total_bytes / 1048576:.1f} Mo lus, {lines_read} lignes"
+        )
+
+    def _end_import(self):
+        # Remet l'interface dans son état normal après un import.
         self.progressBarLogImport.hide()  # Masquer la barre de progression après importation
+        self.progressBarLogImport.resetFormat()
+        self.cancelImportButton.hide()
+        self.cancelImportButton.setEnabled(True)
+        self.importLogButton.setEnabled(True)
+        self.importLogButton_2.setEnabled(True)
+        self.resetButton.setEnabled(True)
+        self.statusbar.clearMessage()
+
+    def on_import_finished(self, result):
+        # Affiche les données importées et le bilan de l'import.
+        self._end_import()
+        if result['imported_files']:
+            self.importLogButton_2.hide()  # Masquer le bouton après importation
         self.display_data()
 
-        if already_imported_files:
-            already_imported_files_str = "\n".join(already_imported_files)
+        # Les copies identiques ignorées sont signalées quel que soit le bilan du reste de l'import
+        duplicate_files_str = ""
+        if result['duplicate_files']:
+            duplicate_files_str = ("\n\nLe contenu des fichiers suivants a déjà été importé depuis un autre emplacement :\n"
+                                   + "\n".join(result['duplicate_files']))
+        # Les fichiers illisibles ou archives corrompues n'ont pas arrêté l'import des autres fichiers
+        if result['failed_files']:
+            QMessageBox.warning(self, "Fichiers illisibles",
+                                "Les fichiers suivants sont illisibles ou corrompus et n'ont pas été importés :\n"
+                                + "\n".join(f"{file_name} : {message}" for file_name, message in result['failed_files']))
+            if not (result['imported_files'] or result['already_imported_files'] or result['duplicate_files']
+                    or result['cancelled']):
+                return  # Aucun autre fichier : pas de bilan de succès
+        if result['cancelled']:
+            QMessageBox.information(self, "Import annulé",
+                                    f"L'import a été annulé. {len(result['imported_files'])} fichier(s) ont été importé(s) "
+                                    "avant l'annulation, le fichier en cours n'a pas été conservé." + duplicate_files_str)
+        elif result['duplicate_files'] and not result['imported_files'] and not result['already_imported_files']:
+            QMessageBox.information(self, "Fichiers deja importé!", duplicate_files_str.lstrip("\n"))
+        elif result['resumed_files'] or result['rewritten_files']:
+            message = f"{result['inserted']} sessions ajoutées, {result['duplicates']} doublons ignorés."
+            if result['resumed_files']:
+                message += "\n\nFichiers repris à partir de la fin du précédent import :\n" + "\n".join(result['resumed_files'])
+            if result['rewritten_files']:
+                message += ("\n\nFichiers réécrits ou remplacés (rotation), réimportés depuis le début :\n"
+                            + "\n".join(result['rewritten_files']))
+            QMessageBox.information(self, "Import incrémental", message + duplicate_files_str)
+        elif result['already_imported_files']:
+            already_imported_files_str = "\n".join(result['already_imported_files'])
             QMessageBox.information(self, "Fichiers deja importé!",
-                                    f"Les fichiers suivants sont déja dans la base de données et n'ont pas été importé! :\n{already_imported_files_str}")
+                                    f"Les fichiers suivants sont déja dans la base de données et n'ont pas été importé! :\n{already_imported_files_str}"
+                                    + duplicate_files_str)
         else:
             QMessageBox.information(self, "Opération réussie!",
-                                    "Les fichiers ont été importés avec succès dans la base de données.")
+                                    "Les fichiers ont été importés avec succès dans la base de données.\n"
+                                    f"{result['inserted']} sessions ajoutées, {result['duplicates']} doublons ignorés."
+                                    + duplicate_files_str)
+
+    def on_import_failed(self, message):
+        # Signale une erreur d'import (la transaction du fichier en cours a été annulée).
+        self._end_import()
+        self.display_data()
+        QMessageBox.critical(self, "Erreur d'importation", f"Une erreur s'est produite : {message}")
+
+    def toggle_watch(self, checked):
+        # Démarre ou arrête la surveillance d'un dossier de logs.
+        if not checked:
+            if self.watch_worker and self.watch_worker.isRunning():
+                self.watch_worker.requestInterruption()
+            self.statusbar.showMessage("Surveillance arrêtée", 3000)
+            return
+
+        directory = QFileDialog.getExistingDirectory(self, 'Dossier de logs à surveiller', os.getcwd())
+        if not directory:
+            self.watchButton.setChecked(False)
+            return
+
+        self.watch_worker = WatchWorker(self.db_path, directory, self)
+        self.watch_worker.sessions_added.connect(self.on_sessions_added)
+        self.watch_worker.watch_failed.connect(self.on_watch_failed)
+        self.watch_worker.start()
+        self.statusbar.showMessage(f"Surveillance de {directory}")
+
+    def on_sessions_added(self, new_sessions):
+        # Ajoute uniquement les nouvelles sessions (nombre par poste) au tableau et aux graphiques ouverts.
+        self.importLogButton_2.hide()
+        self.tableView.show()
+        self.model.on_sessions_added()  # Les sessions qui ne correspondent pas à la recherche sont ignorées
+        if self.bar_chart_window and self.bar_chart_window.isVisible():
+            self.bar_chart_window.on_sessions_added(set(new_sessions))
+        self.statusbar.showMessage(f"{sum(new_sessions.values())} nouvelles sessions importées", 5000)
+
+    def on_watch_failed(self, message):
+        # Arrête la surveillance après une erreur.
+        self.watchButton.setChecked(False)
+        QMessageBox.critical(self, "Erreur de surveillance", f"Une erreur s'est produite : {message}")
 
     def display_data(self):
         # Affiche les données de la table sessions dans le QTableView.
+        # Seule la première page est lue ; les suivantes le sont au défilement (fetchMore).
         self.tableView.show()
-        sessions = self.db_manager.fetch_sessions()
-        self.model.setHorizontalHeaderLabels(['ID', 'Evenement', 'Date', 'Poste'])  # Exclure 'User'
-        self.model.removeRows(0, self.model.rowCount())  # Effacer les données existantes
-        for row in sessions:
-            # Exclure la colonne 'User' (dernier champ)
-            items = [QStandardItem(str(field)) for field in row[:-1]]
-            self.model.appendRow(items)
+        self.model.reload(query=None)
     
     def show_or_hide_search_bar(self):
         # Affiche la barre de recherche ou la cache si on reappui.
@@ -149,29 +279,65 @@ class MainWindow(QMainWindow):
 
     def search_in_logs(self):
         # Recherche dans les logs et affiche les résultats.
-        query = self.lineEdit.text()
-        results = self.db_manager.search_sessions(query)
-        self.model.removeRows(0, self.model.rowCount())  # Effacer les données existantes
-        for row in results:
-            items = [QStandardItem(str(field)) for field in row[:-1]]  # Exclure 'User'
-            self.model.appendRow(items)
+        # Filtres par champ possibles : "computer:PC-LAB user:garcia". La première page est lue dans un thread ;
+        # une recherche encore en cours est interrompue, ses résultats ne seraient plus à jour.
+        self.search_timer.stop()
+        self._cancel_searches()
+        self.search_request_id += 1
+        worker = SearchWorker(self.db_path, self.search_request_id, self.lineEdit.text(),
+                              self.model.order, self.model.PAGE_SIZE, self)
+        worker.page_ready.connect(self.on_search_page_ready)
+        worker.search_failed.connect(self.on_search_failed)
+        worker.finished.connect(lambda: self.search_workers.remove(worker))
+        worker.finished.connect(worker.deleteLater)
+        self.search_workers.append(worker)
+        worker.start()
+
+    def _cancel_searches(self):
+        # Interrompt les recherches en cours.
+        for worker in self.search_workers:
+            worker.requestInterruption()
+
+    def on_search_page_ready(self, request_id, query, rows):
+        # Affiche la première page de la recherche la plus récente ; les suivantes sont lues au défilement.
+        if request_id == self.search_request_id:
+            self.model.show_first_page(rows, query=query)
+
+    def on_search_failed(self, request_id, message):
+        if request_id == self.search_request_id:
+            self.statusbar.showMessage(f"Erreur de recherche : {message}", 5000)
     
     def show_charts(self):
         # Crée une fenêtre persistante ou la réutilise si elle existe déjà
         if not self.bar_chart_window or not self.bar_chart_window.isVisible():
-            self.bar_chart_window = BarChart()
+            self.bar_chart_window = BarChart(self.db_path)
         self.bar_chart_window.show()
 
     def closeEvent(self, event):
-        # Ferme la connexion à la base de données avant de supprimer le fichier.
+        # Ferme la connexion à la base de données avant de supprimer le fichier (sauf base persistante).
+        if self.import_worker and self.import_worker.isRunning():
+            self.import_worker.requestInterruption()
+            self.import_worker.wait()  # Attendre l'annulation propre de l'import
+        if self.watch_worker and self.watch_worker.isRunning():
+            self.watch_worker.requestInterruption()
+            self.watch_worker.wait()
+        self._cancel_searches()
+        for worker in list(self.search_workers):
+            worker.wait()
+        self.model.stop()
         if self.bar_chart_window and self.bar_chart_window.isVisible():
             self.bar_chart_window.close()  # Fermer explicitement BarChart
         self.db_manager.close()
-        if os.path.exists('logs.db'):
-            try:
-                os.remove('logs.db')
-            except PermissionError:
-                print("Le fichier 'logs.db' est toujours utilisé par un autre processus.")
+        if self.persistent:
+            event.accept()
+            return
+        # Fichiers de la base, y compris le journal WAL et sa mémoire partagée s'ils subsistent
+        for path in (self.db_path, self.db_path + '-wal', self.db_path + '-shm'):
+            if os.path.exists(path):
+                try:
+                    os.remove(path)
+                except PermissionError:
+                    print(f"Le fichier '{path}' est toujours utilisé par un autre processus.")
         event.accept()
 
 
@@ -195,7 +361,7 @@ class importLogButton(QPushButton):
         file_names = []
         for url in event.mimeData().urls():
             file_path = url.toLocalFile()
-            if file_path.lower().endswith('.log'):
+            if file_path.lower().endswith(LOG_EXTENSIONS):
                 file_names.append(file_path)
         if file_names:
             self.window().import_logs(file_names)
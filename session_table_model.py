@@ -0,0 +1,134 @@
+# session_table_model.py
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+from db_manager import DBManager
+from import_worker import SearchWorker
+
+
+class SessionTableModel(QAbstractTableModel):
+    # Modèle du tableau des sessions, alimenté à la demande : la vue appelle canFetchMore/fetchMore
+    # quand on approche de la fin, et chaque page est lue par pagination par clé (fetch_sessions_page)
+    # dans un SearchWorker, hors du thread de l'interface ; les lignes sont ajoutées à l'arrivée de la page.
+    # Seules les lignes déjà parcourues sont gardées en mémoire, sous forme de tuples.
+
+    page_failed = pyqtSignal(str)  # Erreur de lecture d'une page
+
+    HEADERS = ['ID', 'Evenement', 'Date', 'Poste']  # La colonne 'User' n'est pas affichée
+    PAGE_SIZE = 500  # Nombre de sessions lues par page
+
+    def __init__(self, db_manager: DBManager, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.order = 'id'
+        self.query = None
+        self._rows = []
+        self._has_more = False
+        self.page_workers = []  # Lectures de page en cours (une lecture remplacée s'arrête d'elle-même)
+        self.page_request_id = 0
+        self._loading = False  # Page suivante demandée et pas encore reçue
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return None
+        return str(self._rows[index.row()][index.column()])
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        # Demande la page suivante, à partir de la clé de tri de la dernière ligne chargée (une seule à la fois).
+        if parent.isValid() or not self._has_more or self._loading:
+            return
+        after = self.db_manager.session_sort_key(self.order, self._rows[-1]) if self._rows else None
+        self._loading = True
+        worker = SearchWorker(self.db_manager.db_path, self.page_request_id, self.query, self.order,
+                              self.PAGE_SIZE, self, after=after)
+        worker.page_ready.connect(self.on_page_ready)
+        worker.search_failed.connect(self.on_page_failed)
+        worker.finished.connect(lambda: self.page_workers.remove(worker))
+        worker.finished.connect(worker.deleteLater)
+        self.page_workers.append(worker)
+        worker.start()
+
+    def on_page_ready(self, request_id, query, rows):
+        # Ajoute la page reçue, si le tableau n'a pas été rechargé ou vidé depuis la demande.
+        if request_id != self.page_request_id:
+            return
+        self._loading = False
+        self._has_more = len(rows) == self.PAGE_SIZE
+        if rows:
+            self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
+
+    def on_page_failed(self, request_id, message):
+        if request_id == self.page_request_id:
+            self._loading = False
+            self._has_more = False
+            self.page_failed.emit(message)
+
+    def _cancel_pages(self):
+        # Interrompt la lecture de page en cours ; sa page, si elle arrive quand même, est ignorée.
+        self.page_request_id += 1
+        self._loading = False
+        for worker in self.page_workers:
+            worker.requestInterruption()
+
+    def stop(self):
+        # Arrête les lectures de page avant la fermeture de la base.
+        self._cancel_pages()
+        for worker in list(self.page_workers):
+            worker.wait()
+
+    def reload(self, order: str = None, query=False):
+        # Recharge le tableau depuis la première page, avec un nouvel ordre et/ou une nouvelle recherche
+        # (query=None affiche toutes les sessions, query=False garde la recherche en cours).
+        if order is not None:
+            self.order = order
+        if query is not False:
+            self.query = query or None
+        self._cancel_pages()
+        self.beginResetModel()
+        self._rows = []
+        self._has_more = True
+        self.endResetModel()
+        self.fetchMore()
+
+    def show_first_page(self, rows, order: str = None, query=False):
+        # Affiche une première page lue ailleurs (recherche en arrière-plan) ; la suite est lue par fetchMore.
+        if order is not None:
+            self.order = order
+        if query is not False:
+            self.query = query or None
+        self._cancel_pages()
+        self.beginResetModel()
+        self._rows = list(rows)
+        self._has_more = len(self._rows) == self.PAGE_SIZE
+        self.endResetModel()
+
+    def clear(self):
+        # Vide le tableau sans relire la base.
+        self._cancel_pages()
+        self.beginResetModel()
+        self._rows = []
+        self._has_more = False
+        self.endResetModel()
+
+    def on_sessions_added(self):
+        # Nouvelles sessions (mode surveillance) : triées par id, elles se placent après la dernière page
+        # et sont lues par la pagination (recherche comprise) ; dans un autre ordre, le tableau est rechargé.
+        if self.order != 'id':
+            self.reload()
+        elif not self._has_more:
+            self._has_more = True
+            self.fetchMore()
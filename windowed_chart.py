@@ -0,0 +1,210 @@
+# windowed_chart.py
+from PyQt6.QtCore import Qt, QEvent
+from PyQt6.QtGui import QPainter, QFont, QColor
+from PyQt6.QtWidgets import QWidget, QHBoxLayout, QVBoxLayout, QScrollBar
+from PyQt6.QtCharts import QChart, QChartView, QBarSet, QHorizontalBarSeries, QBarSeries, QBarCategoryAxis, QValueAxis
+
+
+class WindowedBarChart(QWidget):
+    # Graphique en barres horizontales virtualisé pour un classement de plusieurs milliers de postes.
+    # Seules les barres et les étiquettes des rangs visibles existent (un QBarSet et un axe réutilisés à chaque
+    # défilement) ; les rangs sont lus par pages de PAGE_SIZE quand on fait défiler : fetch_page(offset, limit) lance
+    # la lecture sans l'attendre (hors du thread de l'interface) et la page est livrée par show_page(offset, rangs).
+    # En attendant, la fenêtre reste vide et le titre l'indique.
+    # Une vue d'ensemble résume tout le classement en tranches de rangs consécutifs (maximum de chaque tranche,
+    # calculé par la base) ; la fenêtre affichée y est surlignée et un clic sur une tranche y amène.
+    # La mémoire et le temps de redessin ne dépendent que de la hauteur de la fenêtre, pas du nombre de postes.
+    # refresh() remplace le classement (nouvelles sessions en surveillance) sans quitter les rangs affichés.
+
+    ROW_HEIGHT = 50  # Hauteur d'une barre, comme dans les graphiques non virtualisés
+    CHART_MARGIN = 120  # Hauteur prise par le titre, la légende et l'axe des valeurs
+    PAGE_SIZE = 200  # Rangs lus par requête au défilement
+    OVERVIEW_BUCKETS = 50  # Nombre de tranches de la vue d'ensemble
+    OVERVIEW_HEIGHT = 180
+
+    def __init__(self, title: str, bar_label: str, value_title: str, category_title: str, overview, fetch_page,
+                 convert=None, value_format: str = None, first_page: dict = None, parent=None):
+        # overview : tranches (nombre, minimum, maximum, total) du classement complet, dans l'ordre des rangs.
+        # convert transforme une valeur lue (secondes par exemple) en valeur affichée (pourcentage).
+        super().__init__(parent)
+        self.fetch_page = fetch_page
+        self.convert = convert or (lambda value: value)
+        self.base_title = title
+        self.visible_rows = 1
+        # Seule la page en cours est gardée en mémoire : (premier rang, [(nom, valeur)])
+        self._page_offset = 0
+        self._page = list((first_page or {}).items())
+        self._pending_page = None  # (premier rang, nombre de rangs) de la page demandée et pas encore livrée
+
+        # Graphique de la fenêtre de rangs visibles
+        self.bar_set = QBarSet(bar_label)
+        series = QHorizontalBarSeries()
+        series.append(self.bar_set)
+        series.setLabelsVisible(True)
+        series.setLabelsPosition(QHorizontalBarSeries.LabelsPosition.LabelsInsideEnd)
+        if value_format:
+            series.setLabelsFormat(value_format)
+
+        chart = QChart()
+        chart.addSeries(series)
+        title_font = QFont()
+        title_font.setPointSize(16)
+        title_font.setBold(True)
+        chart.setTitleFont(title_font)
+
+        # Échelle commune à tout le classement, pour que les barres restent comparables en défilant
+        self.axis_x = QValueAxis()
+        self.axis_x.setTitleText(value_title)
+        chart.addAxis(self.axis_x, Qt.AlignmentFlag.AlignBottom)
+        series.attachAxis(self.axis_x)
+
+        self.axis_y = QBarCategoryAxis()
+        self.axis_y.setTitleText(category_title)
+        chart.addAxis(self.axis_y, Qt.AlignmentFlag.AlignLeft)
+        series.attachAxis(self.axis_y)
+
+        self.chart = chart
+        self.chart_view = QChartView(chart)
+        self.chart_view.setRenderHint(QPainter.RenderHint.Antialiasing)
+        self.chart_view.setMinimumWidth(800)
+        self.chart_view.viewport().installEventFilter(self)  # La molette fait défiler les rangs
+
+        self.scroll_bar = QScrollBar(Qt.Orientation.Vertical)
+        self.scroll_bar.valueChanged.connect(self._show_window)
+
+        # Vue d'ensemble : maximum de chaque tranche de rangs
+        self.overview_set = QBarSet("Maximum par tranche de rangs")
+        self.overview_set.setSelectedColor(QColor(Qt.GlobalColor.darkRed))
+        self.overview_set.clicked.connect(self._scroll_to_bucket)
+        overview_series = QBarSeries()
+        overview_series.append(self.overview_set)
+        self.overview_chart = QChart()
+        self.overview_chart.addSeries(overview_series)
+        self.overview_chart.legend().hide()
+        self.overview_axis_x = QBarCategoryAxis()
+        self.overview_axis_x.setLabelsVisible(False)  # Une étiquette par tranche serait illisible
+        self.overview_chart.addAxis(self.overview_axis_x, Qt.AlignmentFlag.AlignBottom)
+        overview_series.attachAxis(self.overview_axis_x)
+        self.overview_axis_y = QValueAxis()
+        self.overview_chart.addAxis(self.overview_axis_y, Qt.AlignmentFlag.AlignLeft)
+        overview_series.attachAxis(self.overview_axis_y)
+        self.overview_view = QChartView(self.overview_chart)
+        self.overview_view.setFixedHeight(self.OVERVIEW_HEIGHT)
+        self._set_overview(overview)
+
+        chart_layout = QHBoxLayout()
+        chart_layout.addWidget(self.chart_view)
+        chart_layout.addWidget(self.scroll_bar)
+        layout = QVBoxLayout(self)
+        layout.addLayout(chart_layout)
+        layout.addWidget(self.overview_view)
+        self._update_scroll_range()
+
+    def _set_overview(self, overview):
+        # Nombre de rangs, échelle commune et vue d'ensemble tirés des tranches du classement complet.
+        self.total_rows = sum(count for count, _, _, _ in overview)
+        # Premier rang de chaque tranche de la vue d'ensemble
+        self.bucket_starts = []
+        first_rank = 0
+        for count, _, _, _ in overview:
+            self.bucket_starts.append(first_rank)
+            first_rank += count
+        self.title = f"{self.base_title} - {self.total_rows} postes"
+        self.chart.setTitle(self.title)
+        max_value = max((self.convert(maximum) for _, _, maximum, _ in overview), default=0)
+        self.axis_x.setRange(0, max_value * 1.05 if max_value else 1)
+        self.overview_set.remove(0, self.overview_set.count())
+        self.overview_set.append([self.convert(maximum) for _, _, maximum, _ in overview])
+        self.overview_chart.setTitle(f"Vue d'ensemble : {len(overview)} tranches de rangs (cliquer pour s'y rendre)")
+        self.overview_axis_x.clear()
+        self.overview_axis_x.append([self._bucket_label(index, count) for index, (count, _, _, _) in enumerate(overview)])
+        self.overview_axis_y.setRange(0, max_value * 1.05 if max_value else 1)
+
+    def refresh(self, overview, convert=None):
+        # Remplace le classement par un plus récent sans revenir au premier rang : la page des rangs affichés est
+        # relue, et l'ancienne reste à l'écran jusqu'à son arrivée. convert remplace la conversion si elle dépend
+        # des données (total des pourcentages).
+        if convert is not None:
+            self.convert = convert
+        self._set_overview(overview)
+        size = max(self.PAGE_SIZE, self.visible_rows)
+        self._pending_page = (max(0, self.scroll_bar.value() - (size - self.visible_rows) // 2), size)
+        self.fetch_page(*self._pending_page)
+        self._update_scroll_range()
+
+    def _bucket_label(self, index: int, count: int) -> str:
+        first_rank = self.bucket_starts[index] + 1
+        return f"{first_rank}-{first_rank + count - 1}"
+
+    @staticmethod
+    def _covers(offset: int, size: int, first: int, last: int, total: int) -> bool:
+        # Vrai si la page [offset, offset + size[ contient les rangs [first, last[ (une page courte finit le classement)
+        return offset <= first and (last <= offset + size or offset + size >= total)
+
+    def _rows(self, first: int, last: int):
+        # Rangs [first, last[ lus dans la page en cours, ou None si elle ne les contient pas : une nouvelle page
+        # centrée sur eux est alors demandée (lecture top-N avec OFFSET, servie par le cache des résultats),
+        # sauf si la page déjà demandée les contient.
+        if self._covers(self._page_offset, len(self._page), first, last, self.total_rows):
+            return self._page[first - self._page_offset:last - self._page_offset]
+        if self._pending_page is None or not self._covers(*self._pending_page, first, last, self.total_rows):
+            size = max(self.PAGE_SIZE, last - first)
+            self._pending_page = (max(0, first - (size - (last - first)) // 2), size)
+            self.fetch_page(*self._pending_page)
+        return None
+
+    def show_page(self, offset: int, rows: dict):
+        # Page demandée par fetch_page : elle remplace la page en cours et la fenêtre est redessinée.
+        if self._pending_page is None or self._pending_page[0] != offset:
+            return  # Page remplacée par une demande plus récente
+        self._pending_page = None
+        self._page_offset = offset
+        self._page = list(rows.items())
+        self._show_window()
+
+    def page_failed(self, offset: int):
+        # Lecture de la page demandée en échec : elle n'est plus attendue, et le prochain défilement la redemande
+        # (la fenêtre n'est pas redessinée ici, ce qui relancerait aussitôt la même lecture).
+        if self._pending_page is None or self._pending_page[0] != offset:
+            return
+        self._pending_page = None
+        self.chart.setTitle(f"{self.title} (page non chargée)")
+
+    def _update_scroll_range(self):
+        self.visible_rows = max(1, (self.chart_view.height() - self.CHART_MARGIN) // self.ROW_HEIGHT)
+        self.scroll_bar.setPageStep(self.visible_rows)
+        self.scroll_bar.setRange(0, max(0, self.total_rows - self.visible_rows))
+        self._show_window()
+
+    def _show_window(self):
+        # Remplace les barres et les étiquettes par celles des rangs visibles (le premier rang en haut).
+        first = self.scroll_bar.value()
+        last = min(self.total_rows, first + self.visible_rows)
+        rows = self._rows(first, last)
+        self.chart.setTitle(self.title if rows is not None else f"{self.title} (chargement...)")
+        rows = rows or []
+        self.bar_set.remove(0, self.bar_set.count())
+        self.axis_y.clear()
+        if rows:
+            self.bar_set.append([self.convert(value) for _, value in reversed(rows)])
+            self.axis_y.append([name for name, _ in reversed(rows)])
+        # Surligne dans la vue d'ensemble les tranches qui recouvrent la fenêtre affichée
+        self.overview_set.deselectAllBars()
+        self.overview_set.selectBars([
+            index for index, start in enumerate(self.bucket_starts)
+            if start < last and (index + 1 == len(self.bucket_starts) or self.bucket_starts[index + 1] > first)
+        ])
+
+    def _scroll_to_bucket(self, index: int):
+        self.scroll_bar.setValue(self.bucket_starts[index])
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_scroll_range()
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Wheel:
+            steps = event.angleDelta().y() // 120
+            self.scroll_bar.setValue(self.scroll_bar.value() - steps * 3)
+            return True
+        return super().eventFilter(obj, event)